@@ -1,37 +1,77 @@
 import sys
-import ctypes
-from PyQt6.QtWidgets import QApplication, QMessageBox
-from PyQt6.QtGui import QIcon  # Import QIcon
-from modules.download_manager import DownloadManager
-from modules.main_window import BrowserWindow
+from modules.startup import startup_timer
+
 
 def main():
+    # Importações dentro de main(): os processos de extração (spawn) reimportam
+    # este arquivo e não devem carregar o Qt
+    with startup_timer.phase("Importação do Qt"):
+        from PyQt6.QtWidgets import QApplication, QMessageBox
+        from PyQt6.QtGui import QIcon  # Import QIcon
+        from PyQt6.QtCore import QTimer
+
+    with startup_timer.phase("Importação dos módulos"):
+        # yt_dlp, eyed3 e requests são carregados sob demanda (ou em segundo plano, abaixo)
+        from modules.constants import STARTUP_REPORT
+        from modules.connectivity import connectivity
+        from modules.download_manager import DownloadManager
+        from modules.api_server import ApiServer
+        from modules.main_window import BrowserWindow, ConnectivityNotifier
+
     # Set the application ID for Windows taskbar
-    myappid = 'ytvd.01102024'  # arbitrary string
-    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
+    if sys.platform == 'win32':
+        import ctypes
+        myappid = 'ytvd.01102024'  # arbitrary string
+        ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
     # Cria a instância da aplicação
-    app = QApplication(sys.argv)
+    with startup_timer.phase("QApplication"):
+        app = QApplication(sys.argv)
+
+        # Define o ícone da aplicação
+        app.setWindowIcon(QIcon('icon.ico'))  # Set the application icon
 
-    # Define o ícone da aplicação
-    app.setWindowIcon(QIcon('icon.ico'))  # Set the application icon
+    # Verifica a conexão com a internet em segundo plano, sem atrasar a janela
+    def on_connectivity(connected):
+        if not connected:
+            QMessageBox.critical(None, "Sem Conexão com a Internet", "Você não está conectado à internet.")
+            app.quit()  # Sai se não houver conexão com a internet
 
-    # Verifica a conexão com a internet antes de iniciar a aplicação
-    if not DownloadManager.is_internet_connected():
-        QMessageBox.critical(None, "Sem Conexão com a Internet", "Você não está conectado à internet.")
-        return  # Sai se não houver conexão com a internet
+    notifier = ConnectivityNotifier()
+    notifier.result.connect(on_connectivity)
+    connectivity.check_async(notifier.result.emit)
+
+    # Carrega as dependências de download enquanto a janela é montada
+    startup_timer.preload()
+
+    # Inicia o servidor da API para a extensão, compartilhando o gerenciador de downloads
+    with startup_timer.phase("Gerenciador de downloads"):
+        download_manager = DownloadManager()
+    with startup_timer.phase("Servidor da API"):
+        ApiServer(download_manager).start_in_background()
 
     # Cria e mostra a janela principal da aplicação
-    window = BrowserWindow()
+    with startup_timer.phase("Janela principal"):
+        window = BrowserWindow(download_manager)
 
-    # Define o ícone da janela principal
-    window.setWindowIcon(QIcon('icon.ico'))  # Set the main window icon
+        # Define o ícone da janela principal
+        window.setWindowIcon(QIcon('icon.ico'))  # Set the main window icon
 
-    window.showMaximized()  # Usa showMaximized() aqui
+        window.showMaximized()  # Usa showMaximized() aqui
 
     # Conecta o evento de fechamento da janela à saída da aplicação
     window.closeEvent = lambda event: app.quit()  # Ensure app quits on close
 
+    def warm_up_extraction():
+        # Só depois de a janela aparecer: o processo importa o yt-dlp sem atrasá-la
+        with startup_timer.phase("Aquecimento da extração"):
+            download_manager.extraction_pool.warm_up()
+
+    QTimer.singleShot(0, warm_up_extraction)
+    if STARTUP_REPORT:
+        # Executa na primeira volta do loop de eventos, logo após a janela aparecer
+        QTimer.singleShot(0, startup_timer.report)
+
     # Inicia o loop de eventos
     sys.exit(app.exec())
 
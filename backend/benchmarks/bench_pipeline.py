@@ -0,0 +1,314 @@
+"""Mede o pipeline completo do DownloadManager (pedido, fila, transferência, cancelamento) sem acessar o YouTube.
+
+Um extrator substituto devolve formatos que apontam para o host local de
+mídia sintética, com tamanho, latência, limite de banda e taxa de falhas
+configuráveis. O relatório traz jobs/min, p50/p99 do tempo até o primeiro
+byte e até a conclusão, CPU e pico de memória; com --baseline, a execução é
+comparada a um resultado salvo e o processo termina com código 1 se alguma
+métrica piorar além da tolerância.
+
+Os números dependem da máquina, então o baseline não é versionado: se o
+arquivo de --baseline ainda não existe, a primeira execução o cria com o
+próprio resultado (e termina com código 0) e as seguintes comparam com ele.
+--save-baseline sobrescreve um baseline existente, ex.: depois de uma
+melhora intencional.
+
+Uso (a partir de backend/):
+    python -m benchmarks.bench_pipeline --jobs 40 --size-mb 4 --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --jobs 40 --size-mb 4 --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from rich.panel import Panel
+from rich.table import Table
+from .fake_host import FakeMediaHost
+from modules.rich_console import console
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+# Direção de cada métrica comparada com o baseline: True = maior é melhor
+COMPARED_METRICS = {
+    "jobs_per_minute": True,
+    "throughput_mib_s": True,
+    "ttfb_p50": False,
+    "ttfb_p99": False,
+    "complete_p50": False,
+    "complete_p99": False,
+    "cpu_seconds_per_job": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo (indisponível no Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS, em bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def make_manager_class():
+    """Cria a subclasse do DownloadManager com o extrator substituto (importada só após ajustar os diretórios)."""
+    from modules.download_manager import DownloadManager
+
+    class BenchDownloadManager(DownloadManager):
+        """DownloadManager cujo extrator devolve um formato HTTP servido pelo host local."""
+
+        def __init__(self, host: FakeMediaHost, size: int, extract_latency: float):
+            self.host = host
+            self.size = size
+            self.extract_latency = extract_latency
+            super().__init__(dashboard=False, restore=False, trace_log=None)
+            # O extrator substituto roda na própria thread; os processos de extração não são usados
+            self.extraction_pool.shutdown()
+
+        def fetch_raw_info(self, youtube_url: str) -> Dict[str, Any]:
+            from modules.url_utils import extract_video_id
+            video_id = extract_video_id(youtube_url)
+            time.sleep(self.extract_latency)
+            return {
+                "_type": "video",
+                "id": video_id,
+                "title": f"bench {video_id}",
+                "webpage_url": youtube_url,
+                "extractor": "youtube",
+                "extractor_key": "Youtube",
+                "duration": 60,
+                "formats": [{
+                    "format_id": "18",
+                    "url": self.host.media_url(video_id, self.size),
+                    "ext": "mp4",
+                    "protocol": "http",
+                    "vcodec": "avc1.42001E",
+                    "acodec": "mp4a.40.2",
+                    "height": 360,
+                    "width": 640,
+                    "filesize": self.size,
+                }],
+            }
+
+    return BenchDownloadManager
+
+
+def video_id_for(index: int) -> str:
+    return f"bench{index:06d}"  # 11 caracteres, como os IDs do YouTube
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    size = int(args.size_mb * 1024 * 1024)
+    original_directory = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="ytvd-bench-")
+    os.chdir(workdir)  # Caches e registros (cache/) ficam no diretório temporário
+    import modules.download_manager as download_manager_module
+    download_manager_module.DOWNLOAD_DIRECTORY = os.path.join(workdir, "downloads")
+    BenchDownloadManager = make_manager_class()
+
+    with FakeMediaHost(size=size, latency=args.latency, throttle=args.throttle_kb * 1024,
+                       failure_rate=args.failure_rate) as host:
+        manager = BenchDownloadManager(host, size, args.extract_latency)
+        if args.concurrency:
+            manager.concurrency.stop()
+            manager.scheduler.set_limit(args.concurrency)
+
+        condition = threading.Condition()
+        requested_at: Dict[str, float] = {}
+        completed_at: Dict[str, float] = {}
+        final_states: Dict[str, str] = {}
+        timings: Dict[str, Dict[str, float]] = {}
+        video_by_job: Dict[str, str] = {}
+
+        def on_snapshot(snapshot):
+            with condition:
+                for entry in snapshot:
+                    if entry["stage"] in TERMINAL_STATES and entry["job_id"] in video_by_job:
+                        final_states[entry["job_id"]] = entry["stage"]
+                        timings[entry["job_id"]] = entry.get("timings") or {}
+                condition.notify_all()
+
+        manager.progress_events.subscribe(on_snapshot)
+
+        def progress_callback_for(video_id: str):
+            def progress_callback(percentage: int):
+                if percentage == 100:
+                    completed_at.setdefault(video_id, time.perf_counter())
+            return progress_callback
+
+        cancel_every = round(1 / args.cancel_fraction) if args.cancel_fraction else 0
+        cancel_targets = []
+
+        cpu_started = time.process_time()
+        started_at = time.perf_counter()
+        for index in range(args.jobs):
+            video_id = video_id_for(index)
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            requested_at[video_id] = time.perf_counter()
+            while True:
+                response, status_code = manager.handle_download_request(
+                    url, "video", "720", progress_callback_for(video_id), source="benchmark")
+                if status_code != 429:
+                    break
+                time.sleep(0.05)
+            if status_code != 202:
+                raise SystemExit(f"Pedido recusado ({status_code}): {response}")
+            with condition:
+                video_by_job[response["job_id"]] = video_id
+            if cancel_every and index % cancel_every == cancel_every - 1:
+                cancel_targets.append((video_id, url))
+
+        def is_finished(video_id: str) -> bool:
+            with condition:
+                return video_id in completed_at or any(
+                    video_by_job[job_id] == video_id for job_id in final_states)
+
+        def cancel_after_first_byte():
+            # Cancela durante a transferência, como um usuário desistindo do download
+            for video_id, url in cancel_targets:
+                while host.first_byte_at(video_id) is None and not is_finished(video_id):
+                    time.sleep(0.01)
+                manager.cancel_download(url, "video")
+
+        canceller = threading.Thread(target=cancel_after_first_byte, daemon=True)
+        canceller.start()
+
+        with condition:
+            finished = condition.wait_for(lambda: len(final_states) == len(video_by_job), timeout=args.timeout)
+        cpu_seconds = time.process_time() - cpu_started
+        # Até a última conclusão: o barramento só confirma os estados finais a cada publicação
+        elapsed = (max(completed_at.values()) if completed_at else time.perf_counter()) - started_at
+        if not finished:
+            console.print(Panel(f"[bold red]Tempo esgotado: {len(final_states)} de {len(video_by_job)} jobs "
+                                f"finalizados.[/bold red]"))
+
+    states = list(final_states.values())
+    done = states.count("done")
+    ttfb = [host.first_byte_at(video_id) - requested_at[video_id]
+            for video_id in requested_at if host.first_byte_at(video_id) is not None]
+    complete = [completed_at[video_id] - requested_at[video_id] for video_id in completed_at]
+    queue_waits = [job_timings.get("queue_wait", 0.0) for job_timings in timings.values()]
+    cancel_stats = manager.get_cancel_stats()
+    os.chdir(original_directory)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "config": {
+            "jobs": args.jobs, "size_mb": args.size_mb, "latency": args.latency, "throttle_kb": args.throttle_kb,
+            "failure_rate": args.failure_rate, "extract_latency": args.extract_latency,
+            "cancel_fraction": args.cancel_fraction, "concurrency": args.concurrency,
+        },
+        "elapsed_seconds": elapsed,
+        "done": done,
+        "failed": states.count("failed"),
+        "cancelled": states.count("cancelled"),
+        "jobs_per_minute": done / elapsed * 60 if elapsed else 0.0,
+        "throughput_mib_s": done * size / elapsed / 1024 / 1024 if elapsed else 0.0,
+        "ttfb_p50": percentile(ttfb, 0.5),
+        "ttfb_p99": percentile(ttfb, 0.99),
+        "complete_p50": percentile(complete, 0.5),
+        "complete_p99": percentile(complete, 0.99),
+        "queue_wait_p50": percentile(queue_waits, 0.5),
+        "cancel_latency_p50_ms": cancel_stats.get("p50_ms"),
+        "cpu_seconds_per_job": cpu_seconds / max(len(states), 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def format_value(value) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Lista as métricas que pioraram além da tolerância em relação ao baseline."""
+    regressions = []
+    for name, higher_is_better in COMPARED_METRICS.items():
+        current, reference = result.get(name), baseline.get(name)
+        if current is None or not reference:
+            continue
+        change = (current - reference) / reference
+        if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+            regressions.append(f"{name}: {format_value(reference)} -> {format_value(current)} ({change:+.0%})")
+    return regressions
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    table = Table(title="Benchmark do pipeline de download")
+    table.add_column("Métrica")
+    table.add_column("Atual", justify="right")
+    if baseline:
+        table.add_column("Baseline", justify="right")
+    for name, value in result.items():
+        if name == "config":
+            continue
+        row = [name, format_value(value)]
+        if baseline:
+            row.append(format_value(baseline.get(name)))
+        table.add_row(*row)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="latência por requisição do host (s)")
+    parser.add_argument("--throttle-kb", type=int, default=4096, help="limite por conexão (KiB/s, 0 = sem limite)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fração de requisições com erro 500")
+    parser.add_argument("--extract-latency", type=float, default=0.05, help="tempo do extrator substituto (s)")
+    parser.add_argument("--cancel-fraction", type=float, default=0.1, help="fração dos jobs cancelados no meio")
+    parser.add_argument("--concurrency", type=int, default=0, help="fixa o limite de downloads (0 = adaptativo)")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    parser.add_argument("--baseline", help="resultado salvo para comparação (criado na primeira execução)")
+    parser.add_argument("--save-baseline", help="grava o resultado como novo baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="piora relativa aceita (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Caminhos relativos ao diretório atual, antes do chdir para o diretório temporário
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    output_paths = [os.path.abspath(path) for path in (args.output, args.save_baseline) if path]
+
+    result = run_benchmark(args)
+    baseline = None
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    elif baseline_path:
+        console.print(Panel(f"[bold yellow]Baseline {baseline_path} não encontrado; esta execução será gravada "
+                            "como baseline e servirá de referência para as próximas.[/bold yellow]"))
+        output_paths.append(baseline_path)
+    print_report(result, baseline)
+
+    for path in output_paths:
+        with open(path, "w", encoding="utf-8") as output_file:
+            json.dump(result, output_file, indent=2)
+
+    if baseline:
+        if baseline.get("config") != result["config"]:
+            console.print(Panel("[bold yellow]Configuração diferente da do baseline; a comparação pode não "
+                                "fazer sentido.[/bold yellow]"))
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            console.print(Panel("[bold red]Regressões em relação ao baseline:\n" + "\n".join(regressions) + "[/bold red]"))
+            sys.exit(1)
+        console.print(Panel("[bold green]Sem regressões em relação ao baseline.[/bold green]"))
+
+
+if __name__ == "__main__":
+    main()
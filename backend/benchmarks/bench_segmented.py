@@ -0,0 +1,46 @@
+"""Compara o download com uma conexão e com faixas paralelas contra um host local com limite por conexão.
+
+Uso (a partir de backend/): python -m benchmarks.bench_segmented [--size-mb 16] [--throttle-kb 2048]
+"""
+import argparse
+import os
+import tempfile
+import time
+from modules.segmented_download import ConnectionBudget, SegmentedDownloader
+from .fake_host import FakeMediaHost, synthetic_bytes
+
+
+def run(host: FakeMediaHost, size: int, connections: int, directory: str) -> float:
+    downloader = SegmentedDownloader(ConnectionBudget(max(connections, 1)), connections_per_job=connections,
+                                     min_segment_size=256 * 1024)
+    output_path = os.path.join(directory, f"bench-{connections}.bin")
+    started_at = time.perf_counter()
+    downloader.download(host.media_url("bench", size), output_path)
+    elapsed = time.perf_counter() - started_at
+
+    with open(output_path, "rb") as output_file:
+        if output_file.read() != synthetic_bytes(0, size):
+            raise SystemExit(f"Arquivo montado incorretamente com {connections} conexões")
+    os.remove(output_path)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--throttle-kb", type=int, default=2048, help="limite por conexão (KiB/s)")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    with FakeMediaHost(size=size, throttle=args.throttle_kb * 1024) as host, tempfile.TemporaryDirectory() as directory:
+        baseline = None
+        for connections in args.connections:
+            elapsed = run(host, size, connections, directory)
+            baseline = baseline or elapsed
+            print(f"{connections:>2} conexão(ões): {elapsed:6.2f} s  {size / elapsed / 1024 / 1024:7.2f} MiB/s  "
+                  f"speed-up {baseline / elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CHUNK_SIZE = 64 * 1024
+RANGE_REGEX = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+def synthetic_bytes(start: int, length: int) -> bytes:
+    """Gera um conteúdo determinístico para qualquer faixa do arquivo (permite validar a montagem)."""
+    pattern = bytes(range(256))
+    offset = start % 256
+    repeated = pattern[offset:] + pattern * (length // 256 + 2)
+    return repeated[:length]
+
+
+class FakeMediaHandler(BaseHTTPRequestHandler):
+    """Serve mídia sintética em /media/<nome>?size=N com suporte a Range, latência, limite e falhas."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Silencia o log padrão do http.server
+
+    def do_GET(self):
+        config = self.server.config
+        parsed_url = urlparse(self.path)
+        if not parsed_url.path.startswith("/media/"):
+            self.send_error(404)
+            return
+
+        size = int(parse_qs(parsed_url.query).get("size", [config["size"]])[0])
+        if config["failure_rate"] and random.random() < config["failure_rate"]:
+            self.send_error(500)
+            return
+        time.sleep(config["latency"])
+
+        start, end = 0, size - 1
+        range_match = RANGE_REGEX.match(self.headers.get("Range", "")) if config["ranges"] else None
+        if range_match:
+            start = int(range_match.group(1))
+            end = min(int(range_match.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        if config["ranges"]:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        # Limite de velocidade por conexão, como o aplicado pelos servidores de vídeo
+        throttle = config["throttle"]
+        position = start
+        try:
+            while position <= end:
+                length = min(CHUNK_SIZE, end - position + 1)
+                self.wfile.write(synthetic_bytes(position, length))
+                # Momento do primeiro byte entregue de cada mídia (tempo até o primeiro byte)
+                self.server.first_bytes.setdefault(parsed_url.path[len("/media/"):], time.perf_counter())
+                position += length
+                if throttle:
+                    time.sleep(length / throttle)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class FakeMediaHost:
+    """Servidor HTTP local que imita um host de vídeos, para benchmarks offline."""
+
+    def __init__(self, size: int = 8 * 1024 * 1024, latency: float = 0.0, throttle: int = 0,
+                 failure_rate: float = 0.0, ranges: bool = True):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMediaHandler)
+        self.server.daemon_threads = True
+        self.server.config = {
+            "size": size, "latency": latency, "throttle": throttle,
+            "failure_rate": failure_rate, "ranges": ranges,
+        }
+        self.server.first_bytes = {}
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-media-host", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def media_url(self, name: str, size: int = None) -> str:
+        return f"{self.base_url}/media/{name}" + (f"?size={size}" if size else "")
+
+    def first_byte_at(self, name: str):
+        """Momento (time.perf_counter) em que o primeiro byte da mídia foi enviado, ou None."""
+        return self.server.first_bytes.get(name)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
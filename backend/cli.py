@@ -0,0 +1,227 @@
+"""Modo sem interface gráfica: baixa URLs da linha de comando, de um arquivo ou da entrada padrão.
+
+O status é emitido em JSON lines na saída padrão (um objeto por linha); as
+mensagens do Rich vão para a saída de erro. Este módulo nunca importa Qt.
+
+Exemplos:
+    python cli.py https://youtu.be/dQw4w9WgXcQ --format audio
+    python cli.py --input lista.txt --quality 1080
+    python cli.py "https://www.youtube.com/playlist?list=..." --format audio
+    python cli.py --sync https://www.youtube.com/@canal --format audio   # só os vídeos novos
+    python cli.py --retag --dry-run   # mostra o que mudaria nas tags da biblioteca, sem a rede
+    cat lista.txt | python cli.py --format audio
+    python cli.py --daemon            # atende a extensão, sem janela
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+SUBMIT_WORKERS = 4
+RETAG_PROGRESS_INTERVAL = 1.0  # segundos entre eventos de progresso ao refazer as tags
+
+
+class JsonLinesWriter:
+    """Escreve eventos de status, um objeto JSON por linha, de forma segura entre threads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields}, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class BatchMonitor:
+    """Acompanha os jobs de um lote pelo barramento de progresso e emite as mudanças."""
+
+    def __init__(self, writer: JsonLinesWriter):
+        self.writer = writer
+        self.condition = threading.Condition()
+        self.stages: Dict[str, str] = {}
+        self.last_entries: Dict[str, Dict[str, Any]] = {}
+        self.job_ids = set()
+
+    def watch(self, job_id: str):
+        with self.condition:
+            self.job_ids.add(job_id)
+            self.condition.notify_all()
+
+    def on_snapshot(self, snapshot: List[Dict[str, Any]]):
+        for entry in snapshot:
+            job_id = entry["job_id"]
+            fields = {key: entry.get(key) for key in (
+                "job_id", "video_id", "title", "format", "stage",
+                "percentage", "downloaded_bytes", "total_bytes", "speed", "eta",
+            )}
+            if self.last_entries.get(job_id) != fields:
+                self.last_entries[job_id] = fields
+                self.writer.emit("progress", **fields)
+        with self.condition:
+            self.stages.update({entry["job_id"]: entry["stage"] for entry in snapshot})
+            self.condition.notify_all()
+
+    def wait(self) -> bool:
+        """Espera todos os jobs do lote terminarem; retorna True se todos foram concluídos."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: all(self.stages.get(job_id) in TERMINAL_STATES for job_id in self.job_ids))
+            return all(self.stages[job_id] == "done" for job_id in self.job_ids)
+
+
+def read_urls(arguments: argparse.Namespace) -> List[str]:
+    """Junta as URLs dos argumentos, do arquivo informado e da entrada padrão (se redirecionada)."""
+    urls = list(arguments.urls)
+    sources: List[Iterable[str]] = []
+    if arguments.input == "-":
+        sources.append(sys.stdin)
+    elif arguments.input:
+        sources.append(open(arguments.input, encoding="utf-8"))
+    elif not urls and not arguments.daemon and not arguments.retag and not sys.stdin.isatty():
+        sources.append(sys.stdin)
+
+    for source in sources:
+        for line in source:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    return urls
+
+
+def parse_arguments(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Downloader do YouTube sem interface gráfica.")
+    parser.add_argument("urls", nargs="*", help="URLs dos vídeos, playlists ou canais")
+    parser.add_argument("-i", "--input", help="arquivo com uma URL por linha ('-' para a entrada padrão)")
+    parser.add_argument("-f", "--format", choices=("audio", "video"), default="video")
+    parser.add_argument("-q", "--quality", default="720", help="altura máxima do vídeo (ex.: 720, 1080)")
+    parser.add_argument("--sync", action="store_true",
+                        help="em playlists/canais, baixa só os vídeos que ainda não estão no arquivo de downloads")
+    parser.add_argument("--retag", action="store_true",
+                        help="refaz as tags dos MP3 da pasta de downloads com os metadados guardados, sem a rede")
+    parser.add_argument("--dry-run", action="store_true", help="com --retag, só relata o que seria alterado")
+    parser.add_argument("--daemon", action="store_true", help="continua rodando e atende a API da extensão")
+    parser.add_argument("--host", help="endereço da API no modo daemon")
+    parser.add_argument("--port", type=int, help="porta da API no modo daemon")
+    parser.add_argument("--no-dashboard", action="store_true", help="não desenha o painel de progresso")
+    parser.add_argument("--trace-log", help="grava em JSON lines as durações das etapas de cada job")
+    return parser.parse_args(argv)
+
+
+def retag_library(writer: JsonLinesWriter, dry_run: bool) -> int:
+    """Refaz as tags da biblioteca; em dry_run, cada arquivo que mudaria vira um evento do relatório."""
+    from modules.constants import DOWNLOAD_DIRECTORY
+    from modules.library_index import LibraryIndex
+    from modules.library_maintenance import LibraryRetagger
+
+    last_progress = [0.0]
+
+    def on_file(result: Dict[str, Any], completed: int, total: int):
+        if result["status"] != "unchanged":
+            writer.emit("retag", **result)
+        now = time.monotonic()
+        if now - last_progress[0] >= RETAG_PROGRESS_INTERVAL or completed == total:
+            last_progress[0] = now
+            writer.emit("retag_progress", completed=completed, total=total)
+
+    library = LibraryIndex(directory=DOWNLOAD_DIRECTORY)
+    try:
+        report = LibraryRetagger(library).run(dry_run=dry_run, progress_callback=on_file)
+    finally:
+        library.close()
+    writer.emit("retag_finished", **report)
+    return 1 if report["failures"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = parse_arguments(sys.argv[1:] if argv is None else argv)
+    writer = JsonLinesWriter(sys.stdout)
+    # A saída padrão fica reservada ao JSON lines; painéis e avisos do Rich vão para stderr
+    sys.stdout = sys.stderr
+
+    from modules.startup import startup_timer
+    with startup_timer.phase("Importação dos módulos"):
+        from modules.download_manager import DownloadManager
+        from modules.url_utils import is_collection_url
+
+    if arguments.retag:
+        return retag_library(writer, arguments.dry_run)
+
+    urls = read_urls(arguments)
+    if not urls and not arguments.daemon:
+        writer.emit("error", message="Nenhuma URL informada.")
+        return 2
+
+    with startup_timer.phase("Gerenciador de downloads"):
+        manager_options = {"trace_log": arguments.trace_log} if arguments.trace_log else {}
+        # Jobs interrompidos (inclusive os da janela) só são retomados no modo daemon: no modo
+        # de execução única, o processo sairia ao fim do próprio lote, deixando-os pela metade
+        download_manager = DownloadManager(
+            dashboard=sys.stderr.isatty() and not arguments.no_dashboard, restore=arguments.daemon,
+            **manager_options)
+    writer.emit("startup", **startup_timer.as_dict())
+    monitor = BatchMonitor(writer)
+    download_manager.progress_events.subscribe(monitor.on_snapshot)
+    writer.emit("started", urls=len(urls), format=arguments.format, daemon=arguments.daemon)
+
+    batches = []
+
+    def submit(url: str):
+        if is_collection_url(url):
+            # Playlist/canal: os vídeos entram na fila conforme são listados
+            if arguments.sync:
+                batch = download_manager.sync(url, arguments.format, arguments.quality, source="cli-sync",
+                                              on_job=monitor.watch)
+            else:
+                batch = download_manager.start_batch(url, arguments.format, arguments.quality, source="cli-batch",
+                                                     on_job=monitor.watch)
+            batches.append(batch)
+            writer.emit("batch", url=url, batch_id=batch.batch_id)
+            return 202
+        try:
+            response, status_code = download_manager.handle_download_request(
+                url, arguments.format, arguments.quality, None, source="cli")
+        except Exception as e:
+            response, status_code = {"error": str(e)}, 500
+        if status_code == 202:
+            monitor.watch(response["job_id"])
+            writer.emit("accepted", url=url, **response)
+        elif status_code == 409:
+            writer.emit("skipped", url=url, reason=response.get("error"))
+        else:
+            writer.emit("rejected", url=url, status=status_code, reason=response.get("error"))
+        return status_code
+
+    with ThreadPoolExecutor(max_workers=SUBMIT_WORKERS, thread_name_prefix="ytvd-cli") as executor:
+        statuses = list(executor.map(submit, urls))
+
+    if arguments.daemon:
+        from modules.api_server import ApiServer
+        options = {key: value for key, value in (("host", arguments.host), ("port", arguments.port)) if value}
+        ApiServer(download_manager, **options).run()
+        return 0
+
+    try:
+        for batch in batches:
+            batch.wait()
+            writer.emit("batch_listed", **batch.get_status())
+        all_done = monitor.wait()
+    except KeyboardInterrupt:
+        writer.emit("interrupted")
+        return 130
+    if download_manager.dashboard:
+        download_manager.dashboard.stop()
+    ok = all_done and all(status in (202, 409) for status in statuses) and all(
+        batch.get_status()["state"] == "done" and not batch.get_status()["failed"] for batch in batches)
+    writer.emit("finished", ok=ok)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+from rich.panel import Panel
+from .constants import API_HOST, API_PORT, OUTPUT_FORMATS
+from .metrics import metrics
+from .rich_console import console
+from .url_utils import extract_video_id, is_collection_url
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15  # segundos
+EVENTS_HEARTBEAT = 15  # segundos entre comentários de keep-alive no stream de eventos
+
+STATUS_REASONS = {
+    200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+}
+
+
+class HttpRequest:
+    """Requisição HTTP já decodificada."""
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.headers = headers
+        self.body = body
+        parsed_target = urlparse(target)
+        self.path = parsed_target.path
+        self.query = {key: values[0] for key, values in parse_qs(parsed_target.query).items()}
+
+    def json(self) -> Dict[str, Any]:
+        """Decodifica o corpo da requisição como JSON (objeto vazio se ausente ou inválido)."""
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+
+class ApiServer:
+    """Servidor HTTP local (asyncio) que atende a extensão do navegador."""
+
+    def __init__(self, download_manager, host: str = API_HOST, port: int = API_PORT):
+        self.download_manager = download_manager
+        self.host = host
+        self.port = port
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.base_events.Server] = None
+        # Rotas que mantêm a conexão aberta e escrevem a resposta por conta própria
+        self.stream_routes = {
+            ("GET", "/events"): self.stream_events,
+        }
+        self.routes = {
+            ("POST", "/download"): self.handle_download,
+            ("POST", "/valid_video"): self.handle_valid_video,
+            ("GET", "/is_downloading"): self.handle_is_downloading,
+            ("POST", "/cancel"): self.handle_cancel,
+            ("GET", "/queue"): self.handle_queue,
+            ("GET", "/concurrency"): self.handle_concurrency,
+            ("GET", "/bandwidth"): self.handle_get_bandwidth,
+            ("POST", "/bandwidth"): self.handle_set_bandwidth,
+            ("GET", "/batches"): self.handle_batches,
+            ("POST", "/batches/cancel"): self.handle_cancel_batch,
+            ("POST", "/sync"): self.handle_sync,
+            ("GET", "/metrics"): self.handle_metrics,
+        }
+
+    # ---------------------------------------------------------------- rotas
+    #
+    # Os métodos do DownloadManager tomam locks e acessam SQLite; por isso
+    # rodam em threads (asyncio.to_thread) e nunca travam o loop de eventos,
+    # que continua atendendo as outras conexões e o stream de progresso.
+
+    async def handle_download(self, request: HttpRequest) -> tuple:
+        """Aceita o pedido e retorna imediatamente; a extração ocorre em segundo plano."""
+        data = request.json()
+        youtube_url = data.get("url", "")
+        format_type = data.get("format", "video")
+        quality = str(data.get("quality", "best"))
+        return await asyncio.to_thread(self.download_manager.submit_download_request, youtube_url, format_type, quality)
+
+    async def handle_valid_video(self, request: HttpRequest) -> tuple:
+        """Valida a URL apenas com análise local e metadados em cache, sem acessar a rede."""
+        youtube_url = request.json().get("url", "")
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            return {"valid": False, "error": "URL de vídeo do YouTube inválida."}, 400
+
+        video_info = await asyncio.to_thread(self.lookup_video_info, youtube_url)
+        return {"valid": True, "video_id": video_id, "title": video_info.get("title")}, 200
+
+    def lookup_video_info(self, youtube_url: str) -> Dict[str, Any]:
+        video_info = self.download_manager.get_cached_video_info(youtube_url)
+        if not video_info:
+            # Adianta a extração para que o download comece sem espera
+            self.download_manager.prefetch_video_info(youtube_url)
+        return video_info
+
+    async def handle_is_downloading(self, request: HttpRequest) -> tuple:
+        youtube_url = request.query.get("url", "")
+        return {"is_downloading": await asyncio.to_thread(self.download_manager.is_downloading, youtube_url)}, 200
+
+    async def handle_cancel(self, request: HttpRequest) -> tuple:
+        data = request.json()
+        return await asyncio.to_thread(self.download_manager.cancel_download, data.get("url", ""), data.get("format"))
+
+    async def handle_queue(self, request: HttpRequest) -> tuple:
+        """Lista os downloads em execução e as posições atuais da fila."""
+        return await asyncio.to_thread(self.download_manager.get_queue_status), 200
+
+    async def handle_concurrency(self, request: HttpRequest) -> tuple:
+        """Retorna o limite atual de downloads simultâneos e o motivo de cada ajuste."""
+        return await asyncio.to_thread(self.download_manager.concurrency.get_status), 200
+
+    async def handle_get_bandwidth(self, request: HttpRequest) -> tuple:
+        return await asyncio.to_thread(self.download_manager.bandwidth_limiter.get_config), 200
+
+    async def handle_set_bandwidth(self, request: HttpRequest) -> tuple:
+        """Reconfigura o teto de banda e os limites por horário sem reiniciar os downloads."""
+        return await asyncio.to_thread(self.configure_bandwidth, request.json())
+
+    def configure_bandwidth(self, data: Dict[str, Any]) -> tuple:
+        limiter = self.download_manager.bandwidth_limiter
+        try:
+            if "rate" in data:
+                limiter.set_rate(int(data["rate"]))
+            if "schedule" in data:
+                limiter.set_schedule([tuple(window) for window in data["schedule"]])
+        except (TypeError, ValueError) as e:
+            return {"error": f"Configuração de banda inválida: {e}"}, 400
+        return limiter.get_config(), 200
+
+    async def handle_batches(self, request: HttpRequest) -> tuple:
+        """Lista os lotes de playlists/canais e o andamento de cada um."""
+        return await asyncio.to_thread(self.download_manager.get_batches_status), 200
+
+    async def handle_cancel_batch(self, request: HttpRequest) -> tuple:
+        return await asyncio.to_thread(self.download_manager.cancel_batch, request.json().get("batch_id", ""))
+
+    async def handle_sync(self, request: HttpRequest) -> tuple:
+        """Inicia a sincronização de um canal/playlist: só os vídeos novos entram na fila."""
+        data = request.json()
+        url = data.get("url", "")
+        format_type = data.get("format", "video")
+        if format_type not in OUTPUT_FORMATS:
+            return {"error": f"Formato inválido: {format_type}"}, 400
+        if not is_collection_url(url):
+            return {"error": "URL de playlist ou canal inválida."}, 400
+        batch = await asyncio.to_thread(self.download_manager.sync, url, format_type, str(data.get("quality", "best")),
+                                        source="extension-sync")
+        return {"message": "Sincronização iniciada.", "batch_id": batch.batch_id}, 202
+
+    async def handle_metrics(self, request: HttpRequest) -> tuple:
+        """Exporta as métricas do pipeline no formato de texto do Prometheus."""
+        return await asyncio.to_thread(metrics.render), 200
+
+    async def stream_events(self, request: HttpRequest, writer: asyncio.StreamWriter):
+        """Envia por Server-Sent Events os retratos de progresso publicados pelo barramento.
+
+        Cada conexão guarda apenas o retrato mais recente: um cliente lento
+        pula estados intermediários em vez de acumular uma fila.
+        """
+        loop = asyncio.get_running_loop()
+        latest: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        def offer(snapshot):
+            if latest.full():
+                latest.get_nowait()
+            latest.put_nowait(snapshot)
+
+        def on_snapshot(snapshot):
+            try:
+                loop.call_soon_threadsafe(offer, snapshot)
+            except RuntimeError:
+                pass  # Loop já encerrado
+
+        progress_events = self.download_manager.progress_events
+        unsubscribe = progress_events.subscribe(on_snapshot)
+        try:
+            headers = [
+                "HTTP/1.1 200 OK",
+                "Content-Type: text/event-stream; charset=utf-8",
+                "Cache-Control: no-cache",
+                "Access-Control-Allow-Origin: *",
+                "Connection: keep-alive",
+            ]
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+            initial_snapshot = await asyncio.to_thread(progress_events.snapshot)
+            if latest.empty():
+                offer(initial_snapshot)
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(latest.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    payload = json.dumps({"jobs": snapshot}, ensure_ascii=False)
+                    writer.write(f"event: progress\ndata: {payload}\n\n".encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            unsubscribe()
+
+    # ------------------------------------------------------------ protocolo
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atende as requisições de uma conexão (com suporte a keep-alive)."""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except ValueError as e:
+                    await self.write_response(writer, {"error": str(e)}, 400, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                stream_handler = self.stream_routes.get((request.method, request.path))
+                if stream_handler is not None:
+                    await stream_handler(request, writer)
+                    break
+
+                body, status_code = await self.dispatch(request)
+                await self.write_response(writer, body, status_code, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise ValueError("Cabeçalho muito grande.")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None  # Conexão encerrada pelo cliente
+            raise
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise ValueError("Linha de requisição inválida.")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        content_length = int(headers.get("content-length", "0") or 0)
+        if content_length > MAX_BODY_BYTES:
+            raise ValueError("Corpo da requisição muito grande.")
+        body = await reader.readexactly(content_length) if content_length else b""
+        return HttpRequest(method.upper(), target, headers, body)
+
+    async def dispatch(self, request: HttpRequest) -> tuple:
+        if request.method == "OPTIONS":
+            return None, 204  # Preflight CORS
+
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in {**self.routes, **self.stream_routes}):
+                return {"error": "Método não permitido."}, 405
+            return {"error": "Rota não encontrada."}, 404
+
+        try:
+            return await handler(request)
+        except Exception as e:
+            console.print(Panel(f"[bold red]Erro ao atender {request.method} {request.path}: {e}[/bold red]"))
+            return {"error": "Erro interno do servidor."}, 500
+
+    async def write_response(self, writer: asyncio.StreamWriter, body, status_code: int, keep_alive: bool = True):
+        if isinstance(body, str):
+            # Respostas em texto puro (ex.: /metrics no formato do Prometheus)
+            payload, content_type = body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        headers = [
+            f"HTTP/1.1 {status_code} {STATUS_REASONS.get(status_code, 'OK')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(payload)}",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    # ------------------------------------------------------------- execução
+
+    async def serve(self):
+        """Inicia o servidor e atende conexões até ser interrompido."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        console.print(Panel(f"[bold blue]Servidor da API ouvindo em http://{self.host}:{self.port}[/bold blue]"))
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # Servidor encerrado por stop()
+
+    def run(self):
+        """Executa o servidor na thread atual (bloqueante)."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def start_in_background(self) -> threading.Thread:
+        """Executa o servidor em uma thread daemon, ao lado da interface gráfica."""
+        thread = threading.Thread(target=self.run, name="ytvd-api-server", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Encerra o servidor a partir de qualquer thread."""
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
@@ -0,0 +1,158 @@
+import itertools
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from .constants import BANDWIDTH_LIMIT, BANDWIDTH_SCHEDULE
+
+MAX_WAIT_SLICE = 0.25  # segundos; permite reagir a cancelamentos e reconfigurações
+
+
+def weight_for_priority(priority: int) -> float:
+    """Converte a prioridade do job (menor = mais urgente) em peso na divisão da banda."""
+    return max(1.0, 2.0 ** (3 - priority))
+
+
+def validate_rate(rate: int) -> int:
+    """Confere um limite de banda em bytes/s (0 = sem limite)."""
+    rate = int(rate)
+    if rate < 0:
+        raise ValueError(f"limite negativo: {rate}")
+    return rate
+
+
+def parse_schedule(schedule: List[Tuple[str, str, int]]) -> List[Tuple[int, int, int]]:
+    """Converte [("HH:MM", "HH:MM", bytes/s), ...] em minutos do dia."""
+    def to_minutes(value: str) -> int:
+        match = re.fullmatch(r"(\d{1,2}):(\d{2})", value)
+        if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"horário inválido: {value!r} (use HH:MM)")
+        return int(match.group(1)) * 60 + int(match.group(2))
+
+    return [(to_minutes(start), to_minutes(end), validate_rate(rate)) for start, end, rate in schedule]
+
+
+class BandwidthLimiter:
+    """Token bucket global compartilhado por todos os downloads, com divisão ponderada entre jobs.
+
+    Cada pedido de bytes recebe uma etiqueta de tempo virtual
+    (max(tempo virtual do job, tempo virtual global) + bytes / peso) e os
+    pedidos são atendidos em ordem de etiqueta sempre que há tokens. Assim a
+    banda total fica no teto configurado, mas jobs de peso maior (áudio,
+    jobs priorizados) recebem uma fatia proporcionalmente maior enquanto
+    disputam com downloads grandes. Limite 0 desativa o controle.
+    """
+
+    def __init__(self, rate: int = BANDWIDTH_LIMIT, schedule: Optional[List[Tuple[str, str, int]]] = None):
+        self.base_rate = rate
+        self.schedule = parse_schedule(BANDWIDTH_SCHEDULE if schedule is None else schedule)
+        self.condition = threading.Condition()
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        self.weights: Dict[str, float] = {}
+        self.virtual_times: Dict[str, float] = {}
+        self.global_virtual_time = 0.0
+        self.waiting: List[Tuple[float, int]] = []
+        self.sequence = itertools.count()
+        self.consumed_bytes = 0
+
+    # ---------------------------------------------------------- configuração
+
+    def set_rate(self, rate: int):
+        """Altera o teto de banda (bytes/s) em tempo real."""
+        rate = validate_rate(rate)
+        with self.condition:
+            self.base_rate = rate
+            self.condition.notify_all()
+
+    def set_schedule(self, schedule: List[Tuple[str, str, int]]):
+        """Substitui os limites por horário em tempo real."""
+        parsed_schedule = parse_schedule(schedule)
+        with self.condition:
+            self.schedule = parsed_schedule
+            self.condition.notify_all()
+
+    def current_rate(self, now: Optional[datetime] = None) -> int:
+        """Teto efetivo agora: o menor entre o limite base e os limites de horário ativos."""
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        rates = [self.base_rate] if self.base_rate else []
+        for start, end, rate in self.schedule:
+            in_window = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if in_window:
+                rates.append(rate)
+        return min(rates) if rates else 0
+
+    def get_config(self) -> Dict[str, Any]:
+        with self.condition:
+            return {
+                "rate": self.base_rate,
+                "effective_rate": self.current_rate(),
+                "schedule": [
+                    (f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}", rate)
+                    for start, end, rate in self.schedule
+                ],
+                "weights": dict(self.weights),
+                "consumed_bytes": self.consumed_bytes,
+            }
+
+    # ------------------------------------------------------------------ jobs
+
+    def register(self, job_id: str, weight: float = 1.0):
+        with self.condition:
+            self.weights[job_id] = max(weight, 0.01)
+            self.virtual_times[job_id] = self.global_virtual_time
+
+    def set_weight(self, job_id: str, weight: float):
+        with self.condition:
+            if job_id in self.weights:
+                self.weights[job_id] = max(weight, 0.01)
+
+    def unregister(self, job_id: str):
+        with self.condition:
+            self.weights.pop(job_id, None)
+            self.virtual_times.pop(job_id, None)
+            self.condition.notify_all()
+
+    # --------------------------------------------------------------- consumo
+
+    def consume(self, job_id: str, nbytes: int, cancelled: Callable[[], bool] = lambda: False):
+        """Bloqueia até que o job possa transferir nbytes dentro do teto global."""
+        with self.condition:
+            self.consumed_bytes += nbytes
+            if not self.current_rate():
+                return
+
+            weight = self.weights.get(job_id, 1.0)
+            start_tag = max(self.virtual_times.get(job_id, 0.0), self.global_virtual_time)
+            tag = (start_tag + nbytes / weight, next(self.sequence))
+            if job_id in self.virtual_times:
+                self.virtual_times[job_id] = tag[0]
+            self.waiting.append(tag)
+
+            try:
+                while True:
+                    rate = self.current_rate()
+                    if not rate or cancelled():
+                        return
+                    self._refill(rate)
+                    if min(self.waiting) == tag and self.tokens > 0:
+                        # Permite saldo negativo para que pedidos maiores que o balde não travem
+                        self.tokens -= nbytes
+                        self.global_virtual_time = max(self.global_virtual_time, start_tag)
+                        return
+                    if min(self.waiting) == tag:
+                        timeout = min(-self.tokens / rate + 0.001, MAX_WAIT_SLICE)
+                    else:
+                        timeout = MAX_WAIT_SLICE
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting.remove(tag)
+                self.condition.notify_all()
+
+    def _refill(self, rate: int):
+        now = time.monotonic()
+        # Balde de até 250 ms de banda: absorve rajadas sem estourar o teto
+        self.tokens = min(self.tokens + (now - self.updated_at) * rate, rate * 0.25)
+        self.updated_at = now
@@ -0,0 +1,224 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from rich.panel import Panel
+from .constants import BATCH_RESOLVE_WORKERS, BATCH_QUEUE_RETRY_INTERVAL, SYNC_KNOWN_STREAK
+from .rich_console import console
+from .url_utils import canonical_url, channel_videos_url, extract_video_id, is_chronological_channel_url
+
+MAX_NESTING = 2  # Canal -> abas -> vídeos
+
+
+def enumerate_entries(url: str, depth: int = 0) -> Iterator[Dict[str, Any]]:
+    """Lista os vídeos de uma playlist ou canal com extração "flat" (sem abrir cada vídeo).
+
+    As páginas da listagem são buscadas sob demanda, então os primeiros
+    itens chegam antes de a enumeração terminar.
+    """
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist'}) as ydl:
+        info = ydl.extract_info(channel_videos_url(url), download=False, process=False)
+        for entry in (info or {}).get("entries") or []:
+            if not entry:
+                continue
+            video_id = extract_video_id(entry.get("url") or "") or (
+                entry.get("id") if entry.get("ie_key") == "Youtube" else None)
+            if video_id:
+                yield {"id": video_id, "title": entry.get("title"), "upload_date": entry.get("upload_date")}
+            elif depth < MAX_NESTING and entry.get("url"):
+                # Abas de canal e playlists aninhadas
+                yield from enumerate_entries(entry["url"], depth + 1)
+
+
+class BatchDownload:
+    """Baixa todos os vídeos de uma playlist ou canal.
+
+    Uma thread enumera a coleção (extração flat, barata) e entrega cada
+    vídeo a um pool limitado que resolve os metadados em paralelo e já o
+    coloca na fila de downloads. Os primeiros downloads começam enquanto a
+    enumeração continua; quando o pool está ocupado, a enumeração espera.
+    """
+
+    def __init__(self, download_manager, url: str, format_type: str, quality: str,
+                 workers: int = BATCH_RESOLVE_WORKERS, source: str = "batch",
+                 on_job: Optional[Callable[[str], None]] = None):
+        self.batch_id = uuid.uuid4().hex[:12]
+        self.download_manager = download_manager
+        self.url = url
+        self.format_type = format_type
+        self.quality = quality
+        self.source = source
+        self.on_job = on_job or (lambda job_id: None)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytvd-batch")
+        # Limita os itens enumerados à espera de resolução
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+        self.state = "enumerating"
+        self.counts = {"enumerated": 0, "queued": 0, "skipped": 0, "failed": 0}
+        self.job_ids: List[str] = []
+        self.error: Optional[str] = None
+        self.thread = threading.Thread(target=self._run, name="ytvd-batch-enumerate", daemon=True)
+
+    def start(self) -> "BatchDownload":
+        self.thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera a enumeração e a entrada de todos os itens na fila."""
+        return self.finished.wait(timeout)
+
+    def cancel(self):
+        """Interrompe a enumeração e cancela os downloads do lote que ainda não terminaram."""
+        self.stop_event.set()
+        with self.lock:
+            job_ids = list(self.job_ids)
+        for job in self.download_manager.get_jobs(job_ids):
+            self.download_manager.cancel_download(job.youtube_url, job.format_type)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "batch_id": self.batch_id,
+                "url": self.url,
+                "format": self.format_type,
+                "state": self.state,
+                "error": self.error,
+                **self.counts,
+            }
+
+    def _count(self, key: str):
+        with self.lock:
+            self.counts[key] += 1
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        """Itens a baixar; subclasses podem filtrar ou encerrar a enumeração mais cedo."""
+        return enumerate_entries(self.url)
+
+    def on_finished(self):
+        """Chamado ao fim da enumeração, antes de liberar quem espera o lote."""
+
+    def _run(self):
+        console.print(Panel(f"[bold blue]Lote iniciado: {self.url}[/bold blue]"))
+        try:
+            for entry in self.entries():
+                if self.stop_event.is_set():
+                    break
+                self._count("enumerated")
+                if self.download_manager.is_file_downloaded(entry["id"], self.format_type == "audio"):
+                    self._count("skipped")
+                    continue
+                if not self._acquire_slot():
+                    break
+                self.executor.submit(self._resolve, entry)
+        except Exception as e:
+            self.error = str(e)
+            console.print(Panel(f"[bold red]Erro ao listar {self.url}: {e}[/bold red]"))
+        finally:
+            self.executor.shutdown(wait=True)
+            with self.lock:
+                self.state = "cancelled" if self.stop_event.is_set() else "failed" if self.error else "done"
+            self.on_finished()
+            self.finished.set()
+            status = self.get_status()
+            console.print(Panel(
+                f"[bold green]Lote {self.state}: {status['enumerated']} vídeo(s) listado(s), "
+                f"{status['queued']} na fila, {status['skipped']} já baixado(s), {status['failed']} com falha[/bold green]"
+            ))
+
+    def _acquire_slot(self) -> bool:
+        """Espera uma vaga no pool de resolução (contrapressão sobre a enumeração)."""
+        while not self.slots.acquire(timeout=0.5):
+            if self.stop_event.is_set():
+                return False
+        return True
+
+    def _resolve(self, entry: Dict[str, Any]):
+        """Extrai os metadados do vídeo e o coloca na fila, esperando se a fila estiver cheia."""
+        try:
+            while not self.stop_event.is_set():
+                response, status_code = self.download_manager.handle_download_request(
+                    canonical_url(entry["id"]), self.format_type, self.quality, None, source=self.source)
+                if status_code == 429:
+                    time.sleep(BATCH_QUEUE_RETRY_INTERVAL)
+                    continue
+                if status_code == 202:
+                    with self.lock:
+                        self.job_ids.append(response["job_id"])
+                    self._count("queued")
+                    self.on_job(response["job_id"])
+                elif status_code == 409:
+                    self._count("skipped")
+                else:
+                    self._count("failed")
+                return
+        except Exception as e:
+            self._count("failed")
+            console.print(Panel(f"[bold red]Erro ao enfileirar {entry['id']}: {e}[/bold red]"))
+        finally:
+            self.slots.release()
+
+
+class SyncBatch(BatchDownload):
+    """Sincronização incremental de um canal ou playlist.
+
+    Os vídeos já registrados no arquivo de downloads (ou presentes na
+    biblioteca) não são extraídos nem enfileirados. Como a aba de vídeos de
+    um canal vem do mais recente para o mais antigo, a listagem para ao
+    chegar no vídeo mais recente da última sincronização concluída (marca
+    d'água) ou após uma sequência de vídeos conhecidos; playlists, sem ordem
+    garantida, são listadas inteiras, o que com a extração flat custa poucas
+    requisições. O arquivo só recebe downloads concluídos, então um vídeo
+    mais novo que a marca d'água que falhou continua sendo tentado nas
+    próximas sincronizações.
+    """
+
+    def __init__(self, download_manager, url: str, format_type: str, quality: str,
+                 known_streak: int = SYNC_KNOWN_STREAK, **options):
+        super().__init__(download_manager, url, format_type, quality, **options)
+        self.archive = download_manager.archive
+        self.known_streak = known_streak
+        self.counts["known"] = 0
+        self.newest_video_id: Optional[str] = None
+        self.last_sync = self.archive.get_sync_state(url, format_type)
+        # Vídeos achados só na biblioteca, gravados no arquivo de uma vez ao fim da listagem
+        self.found_in_library: List[str] = []
+
+    def is_known(self, video_id: str) -> bool:
+        if self.archive.contains(video_id, self.format_type):
+            return True
+        if self.download_manager.is_file_downloaded(video_id, self.format_type == "audio"):
+            # Arquivo baixado antes do arquivo de downloads existir
+            self.found_in_library.append(video_id)
+            return True
+        return False
+
+    def entries(self) -> Iterator[Dict[str, Any]]:
+        chronological = is_chronological_channel_url(self.url)
+        watermark = (self.last_sync or {}).get("newest_video_id") if chronological else None
+        streak = 0
+        for entry in enumerate_entries(self.url):
+            if self.newest_video_id is None:
+                self.newest_video_id = entry["id"]
+            if entry["id"] == watermark:
+                # Os vídeos daqui para trás já foram vistos pela última sincronização
+                break
+            if self.is_known(entry["id"]):
+                self._count("known")
+                streak += 1
+                if chronological and streak >= self.known_streak:
+                    break
+                continue
+            streak = 0
+            yield entry
+
+    def get_status(self) -> Dict[str, Any]:
+        return {**super().get_status(), "last_sync": self.last_sync}
+
+    def on_finished(self):
+        self.archive.add_many(self.found_in_library, self.format_type)
+        if self.state == "done":
+            self.archive.set_sync_state(self.url, self.format_type, self.newest_video_id)
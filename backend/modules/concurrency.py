@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+from rich.panel import Panel
+from .constants import CONCURRENCY_MIN, CONCURRENCY_MAX, CONCURRENCY_ADJUST_INTERVAL
+from .rich_console import console
+
+THROTTLE_MARKERS = ("429", "Too Many Requests", "403", "Forbidden")
+ERROR_RATE_THRESHOLD = 0.3  # Fração de falhas na janela que provoca redução
+MIN_GAIN = 1.05  # Ganho mínimo de vazão para manter um aumento de slots
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Identifica erros típicos de limitação imposta pelo servidor."""
+    return any(marker in str(error) for marker in THROTTLE_MARKERS)
+
+
+class AdaptiveConcurrencyController:
+    """Ajusta o número de downloads simultâneos no estilo AIMD.
+
+    A cada intervalo, avalia a vazão agregada, as falhas/limitações do
+    servidor e o acúmulo no pós-processamento:
+      - limitação ou muitas falhas: reduz pela metade (diminuição multiplicativa);
+      - pós-processamento acumulado: reduz um slot (a CPU é o gargalo);
+      - fila com espera e todos os slots ocupados: aumenta um slot (aumento aditivo),
+        desfazendo o aumento se a vazão não melhorar.
+    Cada mudança é registrada com o motivo.
+    """
+
+    def __init__(self, scheduler, bytes_counter: Callable[[], int], backlog: Callable[[], int],
+                 postprocess_capacity: int, minimum: int = CONCURRENCY_MIN, maximum: int = CONCURRENCY_MAX,
+                 interval: float = CONCURRENCY_ADJUST_INTERVAL):
+        self.scheduler = scheduler
+        self.bytes_counter = bytes_counter
+        self.backlog = backlog
+        self.postprocess_capacity = postprocess_capacity
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.last_bytes = bytes_counter()
+        self.last_sample_at = time.monotonic()
+        self.throughput = 0.0
+        self.throughput_before_increase: Optional[float] = None
+        self.hold_until = 0.0
+        self.history = deque(maxlen=50)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ytvd-concurrency", daemon=True)
+
+    @property
+    def limit(self) -> int:
+        return self.scheduler.limit
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def record_result(self, error: Optional[BaseException] = None):
+        """Registra o resultado de uma transferência."""
+        with self.lock:
+            if error is None:
+                self.successes += 1
+            elif is_throttle_error(error):
+                self.throttled += 1
+            else:
+                self.failures += 1
+
+    def get_status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "limit": self.limit,
+                "minimum": self.minimum,
+                "maximum": self.maximum,
+                "throughput": self.throughput,
+                "postprocess_backlog": self.backlog(),
+                "history": list(self.history),
+            }
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.evaluate()
+            except Exception as e:
+                console.print(Panel(f"[bold red]Erro no controle de concorrência: {e}[/bold red]"))
+
+    def evaluate(self):
+        """Executa uma rodada de avaliação e ajusta o limite se necessário."""
+        now = time.monotonic()
+        total_bytes = self.bytes_counter()
+        elapsed = max(now - self.last_sample_at, 1e-6)
+        with self.lock:
+            self.throughput = (total_bytes - self.last_bytes) / elapsed
+            self.last_bytes, self.last_sample_at = total_bytes, now
+            successes, failures, throttled = self.successes, self.failures, self.throttled
+            self.successes = self.failures = self.throttled = 0
+
+        limit = self.limit
+        finished = successes + failures + throttled
+        backlog = self.backlog()
+        waiting = self.scheduler.queued_count
+
+        if throttled:
+            self._set_limit(limit // 2, f"servidor limitou {throttled} transferência(s)")
+            self.hold_until = now + self.interval * 3
+        elif finished and failures / finished > ERROR_RATE_THRESHOLD:
+            self._set_limit(limit // 2, f"taxa de falhas de {failures}/{finished}")
+            self.hold_until = now + self.interval * 3
+        elif backlog > self.postprocess_capacity * 2:
+            self._set_limit(limit - 1, f"pós-processamento acumulado ({backlog} na fila)")
+        elif self.throughput_before_increase is not None:
+            # Avalia o último aumento: mantém se a vazão cresceu, senão volta atrás
+            if self.throughput < self.throughput_before_increase * MIN_GAIN:
+                self._set_limit(limit - 1, "aumento não melhorou a vazão")
+                self.hold_until = now + self.interval * 6
+            self.throughput_before_increase = None
+        elif now >= self.hold_until and waiting and len(self.scheduler.running_jobs()) >= limit:
+            if self._set_limit(limit + 1, f"{waiting} job(s) aguardando com todos os slots ocupados"):
+                self.throughput_before_increase = self.throughput
+
+    def _set_limit(self, new_limit: int, reason: str) -> bool:
+        new_limit = max(self.minimum, min(self.maximum, new_limit))
+        old_limit = self.limit
+        if new_limit == old_limit:
+            return False
+        self.scheduler.set_limit(new_limit)
+        with self.lock:
+            self.history.append({
+                "time": time.time(), "old": old_limit, "new": new_limit,
+                "reason": reason, "throughput": self.throughput,
+            })
+        console.print(Panel(f"[bold blue]Downloads simultâneos: {old_limit} → {new_limit} ({reason})[/bold blue]"))
+        return True
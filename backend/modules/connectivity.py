@@ -0,0 +1,68 @@
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+from .constants import CONNECTIVITY_HOST, CONNECTIVITY_CACHE_TTL
+
+
+class ConnectivityProbe:
+    """Verificação de conexão com a internet em segundo plano, com resultado em cache.
+
+    A resolução DNS roda em uma thread própria; quem só precisa de uma
+    resposta rápida usa o último resultado conhecido, e chamadas simultâneas
+    compartilham a mesma verificação.
+    """
+
+    def __init__(self, host: str = CONNECTIVITY_HOST, ttl: float = CONNECTIVITY_CACHE_TTL):
+        self.host = host
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.result: Optional[bool] = None
+        self.checked_at = 0.0
+        self.done = threading.Event()
+        self.running = False
+        self.callbacks: List[Callable[[bool], None]] = []
+
+    def check_async(self, callback: Optional[Callable[[bool], None]] = None):
+        """Inicia a verificação (se o cache expirou) e chama callback com o resultado, na thread da verificação."""
+        with self.lock:
+            if self.result is not None and time.monotonic() - self.checked_at < self.ttl:
+                result = self.result
+            else:
+                result = None
+                if callback:
+                    self.callbacks.append(callback)
+                if not self.running:
+                    self.running = True
+                    self.done.clear()
+                    threading.Thread(target=self._run, name="ytvd-connectivity", daemon=True).start()
+        if result is not None and callback:
+            callback(result)
+
+    def is_connected(self, timeout: Optional[float] = None) -> bool:
+        """Retorna o resultado em cache ou espera uma verificação (até timeout segundos)."""
+        self.check_async()
+        with self.lock:
+            if self.result is not None and not self.running:
+                return self.result
+        self.done.wait(timeout)
+        return bool(self.result)
+
+    def _run(self):
+        try:
+            # Rápida resolução DNS em vez de estabelecer uma conexão TCP
+            socket.gethostbyname(self.host)
+            result = True
+        except (socket.gaierror, OSError):
+            result = False
+        with self.lock:
+            self.result = result
+            self.checked_at = time.monotonic()
+            self.running = False
+            callbacks, self.callbacks = self.callbacks, []
+        self.done.set()
+        for callback in callbacks:
+            callback(result)
+
+
+connectivity = ConnectivityProbe()
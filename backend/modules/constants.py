@@ -5,13 +5,72 @@ DEBUG = False
 DOWNLOAD_DIRECTORY = "downloads" if DEBUG else os.path.join(os.path.expanduser("~"), "Music")
 CACHE_DIRECTORY = "cache"
 OUTPUT_FORMATS = {'audio': 'mp3', 'video': 'mp4'}
-MAX_CONCURRENT_DOWNLOADS = 3
+MAX_CONCURRENT_DOWNLOADS = 3  # Limite inicial; ajustado em tempo real pelo controle adaptativo
+ADAPTIVE_CONCURRENCY = True
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 8
+CONCURRENCY_ADJUST_INTERVAL = 5  # segundos entre avaliações do controle adaptativo
+MAX_QUEUED_DOWNLOADS = 500  # Limite de admissão da fila de downloads
+MAX_QUEUED_PER_SOURCE = 300  # Limite por origem (extensão, janela, CLI...)
+DOWNLOAD_SOCKET_TIMEOUT = 10  # segundos; limita a espera de um cancelamento durante leituras paradas
+FFMPEG_PATH = "ffmpeg"
+AUDIO_BITRATE = 192  # kbps
+POSTPROCESS_WORKERS = os.cpu_count() or 2  # Codificações simultâneas, independentes dos downloads
+STREAM_AUDIO = False  # Codifica o áudio enquanto baixa, sem gravar o .m4a intermediário
+STREAM_CHUNK_SIZE = 256 * 1024
+SEGMENTED_DOWNLOADS = True  # Baixa arquivos HTTP simples em várias faixas paralelas
+CONNECTIONS_PER_JOB = 4
+MAX_TOTAL_CONNECTIONS = 12  # Orçamento global de conexões entre todos os downloads
+SEGMENT_MIN_SIZE = 2 * 1024 * 1024
+RESUME_CHECKPOINT_INTERVAL = 2  # segundos entre gravações das faixas pendentes de um download
+RESUME_JOBS = True  # Retoma na inicialização os jobs interrompidos (fechamento ou falha)
+TRACE_LOG = None  # Caminho de um log JSON lines com as etapas de cada job, ex.: os.path.join(CACHE_DIRECTORY, "traces.jsonl")
+BANDWIDTH_LIMIT = 0  # Teto global de banda em bytes/s (0 = sem limite)
+# Limites por horário: [("HH:MM", "HH:MM", bytes/s), ...], ex.: [("09:00", "18:00", 2 * 1024 * 1024)]
+BANDWIDTH_SCHEDULE = []
+PROGRESS_PUBLISH_INTERVAL = 0.5  # segundos entre retratos de progresso publicados
+TERMINAL_STATES = ("done", "failed", "cancelled")  # Estados finais de um job
+CONSOLE_DASHBOARD = True  # Painel único de progresso no terminal
+DASHBOARD_REFRESH_RATE = 4  # redesenhos por segundo do painel
+LIBRARY_WATCH_INTERVAL = 5  # segundos entre verificações da pasta de downloads
+CONNECTIVITY_HOST = "www.google.com"  # Host resolvido na verificação de conexão
+CONNECTIVITY_CACHE_TTL = 60  # segundos em que o resultado da verificação é reaproveitado
+STARTUP_REPORT = True  # Mostra o tempo de cada fase da inicialização
 COMPLETION_SOUND_FREQ = 1000
 COMPLETION_SOUND_DURATION = 500
 
-# Create download directory if it doesn't exist
-os.makedirs(DOWNLOAD_DIRECTORY, exist_ok=True)
-os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+# Servidor local usado pela extensão do navegador
+API_HOST = "127.0.0.1"
+API_PORT = 5000
+
+# Cache de metadados dos vídeos (memória + disco)
+METADATA_CACHE_TTL = 6 * 60 * 60  # 6 horas
+METADATA_CACHE_MAX_ENTRIES = 256
+METADATA_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50 MB
+# Capas dos MP3 (cache em disco, por URL)
+THUMBNAIL_CACHE_MAX_BYTES = 100 * 1024 * 1024  # 100 MB
+THUMBNAIL_MAX_SIZE = 600  # Lado máximo da capa em pixels (requer Pillow; None mantém o original)
+THUMBNAIL_TIMEOUT = 5  # segundos
+THUMBNAIL_WORKERS = 4
+RETAG_WORKERS = 8  # Arquivos regravados em paralelo ao refazer as tags da biblioteca
+# Resultado completo da extração (com a lista de formatos), reaproveitado ao iniciar o download
+RESOLVED_INFO_TTL = 30 * 60  # As URLs dos formatos expiram em algumas horas
+RESOLVED_INFO_MAX_ENTRIES = 32
+# Extração em processos separados, fora do GIL do processo da interface
+EXTRACTION_PROCESSES = True
+EXTRACTION_WORKERS = min(4, os.cpu_count() or 2)
+EXTRACTION_TIMEOUT = 120  # segundos
+EXTRACTION_TIMEOUT_RESET = 2  # Tempos esgotados seguidos que fazem o pool de extração ser recriado
+BATCH_RESOLVE_WORKERS = 4  # Vídeos de uma playlist/canal resolvidos em paralelo
+BATCH_QUEUE_RETRY_INTERVAL = 2  # segundos entre tentativas quando a fila de downloads está cheia
+BATCH_HISTORY_SIZE = 20  # Lotes finalizados mantidos na lista de lotes
+SYNC_KNOWN_STREAK = 10  # Vídeos já conhecidos em sequência que encerram a listagem de um canal na sincronização
+PREFETCH_DELAY = 0.4  # segundos na página do vídeo antes de adiantar a extração
+# Modo de economia do navegador embutido: libera CPU e memória para os downloads
+BROWSER_RESOURCE_SAVER = True
+BROWSER_CACHE_MAX_BYTES = 50 * 1024 * 1024 if BROWSER_RESOURCE_SAVER else 100 * 1024 * 1024
+BROWSER_FREEZE_DELAY = 10  # segundos com a janela fora de foco até congelar a página
+BROWSER_DISCARD_DELAY = 5 * 60  # segundos congelada até descartar a página (imediato com downloads ativos)
 
 # Regex for detecting YouTube videos
 YOUTUBE_VIDEO_REGEX = r'^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.?be/)[\w-]{11}$'
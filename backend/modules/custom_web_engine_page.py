@@ -1,6 +1,13 @@
+import os
 import re
+import time
+from typing import Optional, Tuple
 from PyQt6.QtWebEngineCore import QWebEnginePage
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import pyqtSignal, QObject, QTimer
+from rich.panel import Panel
+from .constants import BROWSER_FREEZE_DELAY, BROWSER_DISCARD_DELAY
+from .metrics import metrics
+from .rich_console import console
 
 # Compila o padrão de regex uma vez
 YOUTUBE_VIDEO_REGEX = re.compile(r'^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.?be/)[\w-]{11}$')
@@ -13,6 +20,39 @@ class URLHandler:
         """Verifica se a URL fornecida é um URL de vídeo do YouTube válido."""
         return bool(YOUTUBE_VIDEO_REGEX.match(url))
 
+# Pausa os vídeos e áudios da página (o YouTube continua tocando mesmo com a janela oculta)
+PAUSE_MEDIA_SCRIPT = "document.querySelectorAll('video, audio').forEach(media => media.pause());"
+
+
+def process_usage(pid: int) -> Optional[Tuple[int, float]]:
+    """Retorna (memória residente em bytes, tempo de CPU em segundos) de um processo.
+
+    Usa o psutil, se instalado; sem ele, lê o /proc (Linux). None se não for possível medir.
+    """
+    if not pid:
+        return None
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                cpu_times = process.cpu_times()
+                return process.memory_info().rss, cpu_times.user + cpu_times.system
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            # Os campos após o nome do processo começam no estado (campo 3 do proc(5))
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        return int(fields[21]) * os.sysconf("SC_PAGE_SIZE"), (int(fields[11]) + int(fields[12])) / ticks
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
 class TitleFetcher:
     """Obtém o título de uma página da web."""
     
@@ -61,3 +101,163 @@ class CustomWebEnginePage(QWebEnginePage):
         print(f"Título da página obtido: {title}")  # Impressão de depuração
         # Emite o título ou fallback
         self.title_updated.emit(title if title else "YouTube")
+
+
+class PageResourceSaver(QObject):
+    """Modo de economia de recursos da página do navegador embutido.
+
+    Com a janela fora de foco, a página é ocultada e congelada (o JavaScript
+    para, a memória é mantida) e, depois de um tempo ou se houver downloads
+    ativos, descartada (o processo de renderização libera a memória e a
+    página é recarregada ao voltar). Durante os downloads, a mídia é pausada e
+    silenciada mesmo com a janela em foco. A memória e o tempo de CPU
+    poupados são estimados pelo processo de renderização.
+    """
+
+    def __init__(self, view, freeze_delay: float = BROWSER_FREEZE_DELAY,
+                 discard_delay: float = BROWSER_DISCARD_DELAY, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.discard_delay = discard_delay
+        self.window_active = True
+        self.downloads_active = False
+        self.muted_by_saver = False
+        self.suspended_at: Optional[float] = None
+        self.suspended_usage: Optional[Tuple[int, float]] = None
+        self.cpu_rate = 0.0  # Segundos de CPU por segundo gastos pela página ativa
+        self.active_sample = (time.monotonic(), self.usage())
+        self.stats = {"suspensions": 0, "discards": 0, "suspended_seconds": 0.0,
+                      "memory_freed_bytes": 0, "cpu_seconds_saved": 0.0}
+
+        self.freeze_timer = QTimer(self)
+        self.freeze_timer.setSingleShot(True)
+        self.freeze_timer.setInterval(int(freeze_delay * 1000))
+        self.freeze_timer.timeout.connect(self.suspend)
+        self.discard_timer = QTimer(self)
+        self.discard_timer.setSingleShot(True)
+        self.discard_timer.setInterval(int(discard_delay * 1000))
+        self.discard_timer.timeout.connect(self.discard)
+        metrics.add_collector(self.collect_metrics)
+
+    @property
+    def page(self) -> QWebEnginePage:
+        return self.view.page()
+
+    def usage(self) -> Optional[Tuple[int, float]]:
+        return process_usage(self.page.renderProcessPid())
+
+    def state(self) -> QWebEnginePage.LifecycleState:
+        return self.page.lifecycleState()
+
+    # ------------------------------------------------------------- eventos
+
+    def set_window_active(self, active: bool):
+        """Chamado quando a janela ganha ou perde o foco (ou é minimizada)."""
+        if active == self.window_active:
+            return
+        self.window_active = active
+        if active:
+            self.freeze_timer.stop()
+            self.resume()
+        else:
+            self.freeze_timer.start()
+
+    def set_downloads_active(self, active: bool):
+        """Chamado a cada atualização do progresso dos downloads."""
+        if active == self.downloads_active:
+            return
+        self.downloads_active = active
+        if active:
+            self.quiet_media()
+            if self.state() == QWebEnginePage.LifecycleState.Frozen:
+                self.discard()
+        elif self.muted_by_saver and self.state() == QWebEnginePage.LifecycleState.Active:
+            self.page.setAudioMuted(False)
+            self.muted_by_saver = False
+
+    # ----------------------------------------------------------- transições
+
+    def quiet_media(self):
+        """Pausa e silencia a mídia da página."""
+        if self.state() != QWebEnginePage.LifecycleState.Active:
+            return
+        self.page.runJavaScript(PAUSE_MEDIA_SCRIPT)
+        if not self.page.isAudioMuted():
+            self.page.setAudioMuted(True)
+            self.muted_by_saver = True
+
+    def suspend(self):
+        """Oculta e congela a página; com downloads ativos, descarta-a de uma vez."""
+        if self.window_active or self.state() != QWebEnginePage.LifecycleState.Active:
+            return
+        now = time.monotonic()
+        sampled_at, sample = self.active_sample
+        self.suspended_usage = self.usage()
+        if sample and self.suspended_usage and now > sampled_at:
+            self.cpu_rate = max(0.0, (self.suspended_usage[1] - sample[1]) / (now - sampled_at))
+
+        self.quiet_media()
+        # O Qt só congela ou descarta páginas que não estão visíveis
+        self.view.setVisible(False)
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+        if self.state() != QWebEnginePage.LifecycleState.Frozen:
+            return
+        self.suspended_at = now
+        self.stats["suspensions"] += 1
+        if self.downloads_active:
+            self.discard()
+        else:
+            self.discard_timer.start()
+
+    def discard(self):
+        """Descarta a página congelada, liberando a memória do processo de renderização."""
+        self.discard_timer.stop()
+        if self.state() != QWebEnginePage.LifecycleState.Frozen:
+            return
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+        if self.state() == QWebEnginePage.LifecycleState.Discarded:
+            self.stats["discards"] += 1
+
+    def resume(self):
+        """Reativa a página (uma página descartada é recarregada) e relata o que foi poupado."""
+        self.discard_timer.stop()
+        if self.suspended_at is None:
+            self.view.setVisible(True)
+            return
+        elapsed = time.monotonic() - self.suspended_at
+        current = self.usage()
+        memory_freed = cpu_saved = 0.0
+        if self.suspended_usage:
+            rss_before, cpu_before = self.suspended_usage
+            # Sem processo (descartado), nada foi gasto desde a suspensão
+            rss_now, cpu_now = current if current else (0, cpu_before)
+            memory_freed = max(0, rss_before - rss_now)
+            cpu_saved = max(0.0, self.cpu_rate * elapsed - max(0.0, cpu_now - cpu_before))
+
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.view.setVisible(True)
+        if self.muted_by_saver and not self.downloads_active:
+            self.page.setAudioMuted(False)
+            self.muted_by_saver = False
+        self.suspended_at = None
+        self.suspended_usage = None
+        self.active_sample = (time.monotonic(), self.usage())
+
+        self.stats["suspended_seconds"] += elapsed
+        self.stats["memory_freed_bytes"] = int(memory_freed)  # Da última suspensão
+        self.stats["cpu_seconds_saved"] += cpu_saved
+        console.print(Panel(
+            f"[bold blue]Navegador reativado após {elapsed:.0f} s em economia: "
+            f"{memory_freed / (1024 * 1024):.0f} MB de memória liberados, "
+            f"~{cpu_saved:.1f} s de CPU poupados para os downloads.[/bold blue]"))
+
+    def collect_metrics(self) -> list:
+        """Amostras do modo de economia para o /metrics."""
+        return [
+            ("ytvd_browser_suspended", "gauge", {}, int(self.suspended_at is not None)),
+            ("ytvd_browser_suspensions_total", "counter", {}, self.stats["suspensions"]),
+            ("ytvd_browser_discards_total", "counter", {}, self.stats["discards"]),
+            ("ytvd_browser_suspended_seconds_total", "counter", {}, self.stats["suspended_seconds"]),
+            ("ytvd_browser_cpu_seconds_saved_total", "counter", {}, self.stats["cpu_seconds_saved"]),
+            ("ytvd_browser_memory_freed_bytes", "gauge", {}, self.stats["memory_freed_bytes"]),
+        ]
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional
+from .constants import CACHE_DIRECTORY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    video_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, format)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    url TEXT NOT NULL,
+    format TEXT NOT NULL,
+    newest_video_id TEXT,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (url, format)
+);
+"""
+
+
+class DownloadArchive:
+    """Registro persistente dos vídeos já baixados, por ID e formato.
+
+    Ao contrário do índice da biblioteca, não depende dos arquivos
+    continuarem na pasta: um vídeo apagado pelo usuário não volta a ser
+    baixado pela sincronização. Também guarda, por canal/playlist, o vídeo
+    mais recente visto na última sincronização (marca d'água).
+    """
+
+    def __init__(self, db_path: str = os.path.join(CACHE_DIRECTORY, "archive.sqlite3")):
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def contains(self, video_id: str, format_type: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM archive WHERE video_id = ? AND format = ?", (video_id, format_type)
+            ).fetchone()
+        return row is not None
+
+    def add(self, video_id: Optional[str], format_type: str):
+        """Registra um download concluído."""
+        if not video_id:
+            return
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO archive (video_id, format, completed_at) VALUES (?, ?, ?)",
+                (video_id, format_type, time.time()),
+            )
+
+    def add_many(self, video_ids: Iterable[str], format_type: str):
+        """Registra vários vídeos numa única transação."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO archive (video_id, format, completed_at) VALUES (?, ?, ?)",
+                [(video_id, format_type, now) for video_id in video_ids],
+            )
+
+    def count(self, format_type: Optional[str] = None) -> int:
+        query, params = "SELECT COUNT(*) FROM archive", ()
+        if format_type:
+            query, params = query + " WHERE format = ?", (format_type,)
+        with self.lock:
+            return self.connection.execute(query, params).fetchone()[0]
+
+    # ---------------------------------------------------------- marca d'água
+
+    def get_sync_state(self, url: str, format_type: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT newest_video_id, synced_at FROM sync_state WHERE url = ? AND format = ?", (url, format_type)
+            ).fetchone()
+        return {"newest_video_id": row[0], "synced_at": row[1]} if row else None
+
+    def set_sync_state(self, url: str, format_type: str, newest_video_id: Optional[str]):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync_state (url, format, newest_video_id, synced_at) VALUES (?, ?, ?, ?)",
+                (url, format_type, newest_video_id, time.time()),
+            )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
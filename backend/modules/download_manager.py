@@ -1,43 +1,103 @@
 import os
+import glob
+import time
 import threading
-import socket
 import re
-from queue import Queue
-from typing import Dict, Any
-import requests
-import eyed3
-import yt_dlp
-from rich.console import Console
-from rich.live import Live
+import copy
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, DownloadColumn, TransferSpeedColumn, TimeRemainingColumn
-from .constants import DOWNLOAD_DIRECTORY, OUTPUT_FORMATS, MAX_CONCURRENT_DOWNLOADS
-
-# Inicializa o console Rich
-console = Console()
-
-# Cria o diretório de download se não existir
-os.makedirs(DOWNLOAD_DIRECTORY, exist_ok=True)
+from .constants import (
+    DOWNLOAD_DIRECTORY, OUTPUT_FORMATS, DOWNLOAD_SOCKET_TIMEOUT, STREAM_AUDIO, SEGMENTED_DOWNLOADS,
+    ADAPTIVE_CONCURRENCY, CONSOLE_DASHBOARD, RESOLVED_INFO_TTL, RESOLVED_INFO_MAX_ENTRIES, RESUME_JOBS,
+    TRACE_LOG, BATCH_HISTORY_SIZE
+)
+from .batch import BatchDownload, SyncBatch
+from .bandwidth import BandwidthLimiter, weight_for_priority
+from .connectivity import connectivity
+from .download_archive import DownloadArchive
+from .concurrency import AdaptiveConcurrencyController
+from .extraction_pool import ExtractionPool
+from .job_store import JobStore
+from .library_index import LibraryIndex, is_temporary_file
+from .metadata_cache import MetadataCache
+from .metrics import JobTraceRecorder, metrics
+from .progress_events import ProgressEventBus, transfer_fields
+from .rich_console import ConsoleDashboard, console
+from .postprocessing import PostProcessingPool, merge_formats
+from .single_flight import SingleFlight
+from .segmented_download import ConnectionBudget, SegmentedDownloader, can_segment
+from .streaming import can_stream, stream_to_mp3
+from .tagging import Mp3Tagger
+from .scheduler import DownloadJob, DownloadScheduler, QueueFullError
+from .url_utils import extract_video_id, is_collection_url
 
 # Regex para detectar vídeos do YouTube
 YOUTUBE_VIDEO_REGEX = r'^(https?://)?(www\.)?(youtube\.com/watch\?v=|youtu\.?be/)[\w-]{11}$'
 
 
 class DownloadManager:
-    def __init__(self):
-        self.active_downloads: Dict[str, Dict[str, Any]] = {}
-        self.download_queue = Queue()
+    def __init__(self, dashboard: bool = CONSOLE_DASHBOARD, restore: bool = RESUME_JOBS,
+                 trace_log: Optional[str] = TRACE_LOG):
+        # Cria o diretório de download se não existir
+        os.makedirs(DOWNLOAD_DIRECTORY, exist_ok=True)
+        # Jobs aceitos (na fila ou em execução), indexados pelo job_id
+        self.jobs: Dict[str, DownloadJob] = {}
         self.lock = threading.Lock()
+        self.scheduler = DownloadScheduler(self.download_media)
+        self.postprocessing_pool = PostProcessingPool()
+        # Modo opcional que codifica o áudio durante o download (sem .m4a intermediário)
+        self.stream_audio = STREAM_AUDIO
+        self.segmented_downloads = SEGMENTED_DOWNLOADS
+        self.segmented_downloader = SegmentedDownloader(ConnectionBudget())
+        self.bandwidth_limiter = BandwidthLimiter()
+        self.concurrency = AdaptiveConcurrencyController(
+            self.scheduler, lambda: self.bandwidth_limiter.consumed_bytes,
+            lambda: self.postprocessing_pool.backlog, self.postprocessing_pool.workers
+        )
+        if ADAPTIVE_CONCURRENCY:
+            self.concurrency.start()
+        # Tempo entre o pedido de cancelamento e a liberação do slot (segundos)
+        self.cancel_latencies = deque(maxlen=100)
+        # Progresso agrupado por job, publicado para a janela e para o stream da API
+        self.progress_events = ProgressEventBus()
+        self.progress_events.start()
+        self.dashboard = ConsoleDashboard(console) if dashboard else None
+        if self.dashboard:
+            self.progress_events.subscribe(self.dashboard.update)
+        # Registro durável dos jobs, atualizado pelos retratos do barramento
+        self.job_store = JobStore()
+        self.progress_events.subscribe(self.job_store.record_snapshot)
+        # Contagem dos jobs finalizados e, opcionalmente, uma linha de trace JSON por job
+        self.job_traces = JobTraceRecorder(metrics, trace_log)
+        self.progress_events.subscribe(self.job_traces.record_snapshot)
+        self.metadata_cache = MetadataCache()
+        # Tags dos MP3, com capas buscadas por sessão compartilhada e guardadas em cache
+        self.tagger = Mp3Tagger()
+        self.extractions = SingleFlight()
+        # Os processos de extração sobem sob demanda (a janela aquece um após aparecer)
+        self.extraction_pool = ExtractionPool()
+        # Extrações completas recentes (video_id -> (momento, info)), usadas para começar o download sem extrair de novo
+        self.resolved_infos: OrderedDict = OrderedDict()
+        self.library = LibraryIndex(directory=DOWNLOAD_DIRECTORY)
+        self.library.start_watching()
+        # IDs já baixados, mantidos mesmo que o arquivo seja apagado (usado pela sincronização)
+        self.archive = DownloadArchive()
+        # Pedidos aceitos pela API que ainda estão na etapa de extração, por (video_id, formato)
+        self.pending_requests: Dict[tuple, str] = {}
+        self.prefetching = set()
+        # Lotes de playlists/canais, indexados pelo batch_id
+        self.batches: Dict[str, BatchDownload] = {}
+        self.request_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ytvd-request")
+        metrics.add_collector(self.collect_metrics)
+        if restore:
+            self.restore_jobs()
 
     @staticmethod
-    def is_internet_connected() -> bool:
-        """Verifica se a internet está conectada."""
-        try:
-            # Realiza uma rápida resolução DNS em vez de estabelecer uma conexão TCP
-            socket.gethostbyname("www.google.com")
-            return True
-        except socket.gaierror:
-            return False
+    def is_internet_connected(timeout: Optional[float] = None) -> bool:
+        """Verifica se a internet está conectada (resultado em cache por alguns segundos)."""
+        return connectivity.is_connected(timeout)
 
     @staticmethod
     def sanitize_filename(filename: str) -> str:
@@ -45,139 +105,456 @@ class DownloadManager:
         reserved_chars_pattern = r'[<>:"/\\|?*]'
         return re.sub(r'_+', '_', re.sub(reserved_chars_pattern, '_', filename))
 
-    @staticmethod
-    def add_metadata_to_mp3(file_path: str, video_info: Dict[str, Any]):
-        """Adiciona metadados ao arquivo MP3 baixado."""
+    def add_metadata_to_mp3(self, file_path: str, video_info: Dict[str, Any]):
+        """Adiciona metadados e capa ao arquivo MP3 baixado, em um único salvamento."""
+        # Guardados sem prazo de validade: permitem refazer as tags depois, sem a rede
+        self.library.save_metadata(video_info.get("id"), video_info)
         try:
-            audiofile = eyed3.load(file_path)
-            if not audiofile or not audiofile.tag:
-                audiofile.initTag()
-
-            audiofile.tag.title = video_info.get("title", "Título Desconhecido")
-            audiofile.tag.artist = video_info.get("uploader", "Artista Desconhecido")
-            audiofile.tag.album = "Download do YouTube"
-            audiofile.tag.year = video_info.get("upload_date", "")[:4]
-            audiofile.tag.comments.set(video_info.get("description", ""))
-
-            # Baixa a miniatura em uma thread separada
-            thumbnail_url = video_info.get("thumbnail")
-            if thumbnail_url:
-                threading.Thread(target=DownloadManager.download_thumbnail, args=(thumbnail_url, audiofile)).start()
-
-            audiofile.tag.save()
+            self.tagger.tag(file_path, video_info)
             console.print(Panel(f"[bold green]Metadados adicionados a {file_path}[/bold green]"))
         except Exception as e:
             console.print(Panel(f"[bold red]Erro ao adicionar metadados a {file_path}: {e}[/bold red]"))
 
-    @staticmethod
-    def download_thumbnail(thumbnail_url: str, audiofile):
-        """Baixa a miniatura e a define para o arquivo de áudio."""
+    def extract_video_info(self, youtube_url: str) -> Dict[str, Any]:
+        """Retorna as informações do vídeo, consultando o cache antes de extrair.
+
+        Pedidos simultâneos do mesmo vídeo compartilham uma única extração.
+        """
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            return self.fetch_video_info(youtube_url)
+
+        cached_info = self.metadata_cache.get(video_id)
+        if cached_info:
+            return cached_info
+
+        def extract():
+            video_info = self.summarize_video_info(self.resolve_video(youtube_url))
+            if video_info:
+                self.metadata_cache.set(video_id, video_info)
+            return video_info
+
+        return self.extractions.do(video_id, extract)
+
+    def resolve_video(self, youtube_url: str) -> Dict[str, Any]:
+        """Retorna a extração completa do vídeo (metadados e lista de formatos), sem escolher formato.
+
+        O resultado fica guardado por alguns minutos para que o download comece
+        sem repetir a extração (a escolha do formato é feita depois, por job).
+        """
+        video_id = extract_video_id(youtube_url)
+        resolved_info = self.get_resolved_info(video_id)
+        if resolved_info:
+            metrics.inc("ytvd_resolved_info_total", result="hit")
+            return resolved_info
+        metrics.inc("ytvd_resolved_info_total", result="miss")
+
+        def extract():
+            info = self.fetch_raw_info(youtube_url)
+            if info and video_id:
+                with self.lock:
+                    self.resolved_infos[video_id] = (time.monotonic(), info)
+                    self.resolved_infos.move_to_end(video_id)
+                    while len(self.resolved_infos) > RESOLVED_INFO_MAX_ENTRIES:
+                        self.resolved_infos.popitem(last=False)
+            return info
+
+        info = self.extractions.do(("resolve", video_id or youtube_url), extract)
+        # Quem esperou pela mesma extração recebe a sua própria cópia, como no cache
+        return copy.deepcopy(info) if info else info
+
+    def get_resolved_info(self, video_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Retorna uma cópia da extração completa recente do vídeo, se houver."""
+        with self.lock:
+            entry = self.resolved_infos.get(video_id)
+            if entry is None:
+                return None
+            resolved_at, info = entry
+            if time.monotonic() - resolved_at > RESOLVED_INFO_TTL:
+                del self.resolved_infos[video_id]
+                return None
+        # O yt-dlp altera o dicionário ao processar; cada uso recebe a sua cópia
+        return copy.deepcopy(info)
+
+    def fetch_raw_info(self, youtube_url: str) -> Dict[str, Any]:
+        """Extrai a página do vídeo sem processar os formatos, no pool de processos de extração."""
         try:
-            response = requests.get(thumbnail_url, timeout=5)
-            if response.status_code == 200:
-                audiofile.tag.images.set(3, response.content, "image/jpeg", "Capa do Álbum")
-                audiofile.tag.save()
+            with metrics.stage("extract"):
+                return self.extraction_pool.extract(youtube_url)
         except Exception as e:
-            console.print(Panel(f"[bold red]Erro ao baixar a miniatura: {e}[/bold red]"))
+            console.print(Panel(f"[bold red]Erro ao extrair informações do vídeo: {e}[/bold red]"))
+            return {}
 
     @staticmethod
-    def extract_video_info(youtube_url: str) -> Dict[str, Any]:
-        """Extrai informações do vídeo a partir da URL do YouTube fornecida."""
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(youtube_url, download=False)
-                return {
-                    "title": info.get("title"),
-                    "duration": info.get("duration"),
-                    "thumbnail": info.get("thumbnail"),
-                    "uploader": info.get("uploader"),
-                    "upload_date": info.get("upload_date"),
-                    "description": info.get("description")
-                }
-        except Exception as e:
-            console.print(Panel(f"[bold red]Erro ao extrair informações do vídeo: {e}[/bold red]"))
+    def summarize_video_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduz a extração aos metadados usados na fila, nas tags e no cache."""
+        if not info:
             return {}
+        return {
+            "id": info.get("id"),
+            "title": info.get("title"),
+            "duration": info.get("duration"),
+            "thumbnail": info.get("thumbnail"),
+            "uploader": info.get("uploader"),
+            "upload_date": info.get("upload_date"),
+            "description": info.get("description")
+        }
 
-    def get_download_options(self, title: str, is_audio: bool, quality: str = 'best') -> Dict[str, Any]:
-        """Obtém opções de download para vídeo/áudio do YouTube."""
-        file_extension = OUTPUT_FORMATS['audio'] if is_audio else OUTPUT_FORMATS['video']
-        sanitized_title = self.sanitize_filename(title)
+    def fetch_video_info(self, youtube_url: str) -> Dict[str, Any]:
+        """Extrai informações do vídeo a partir da URL do YouTube fornecida."""
+        return self.summarize_video_info(self.fetch_raw_info(youtube_url))
 
+    def get_download_options(self, file_stem: str, is_audio: bool, quality: str = 'best') -> Dict[str, Any]:
+        """Obtém opções de download para vídeo/áudio do YouTube."""
         options = {
-            'outtmpl': os.path.join(DOWNLOAD_DIRECTORY, f"{sanitized_title}.%(ext)s"),
+            'outtmpl': os.path.join(DOWNLOAD_DIRECTORY, f"{file_stem}.%(ext)s"),
             'format': 'bestaudio[ext=m4a]/best[ext=mp3]' if is_audio else f'bestvideo[ext=mp4][height<={quality}]+bestaudio[ext=m4a]/best[ext=mp4][height<={quality}]/best',
-            'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}] if is_audio else [],
+            # A conversão para MP3 é feita pelo PostProcessingPool, fora do slot de download
+            'postprocessors': [],
+            # O progresso no terminal é desenhado apenas pelo painel único
+            'noprogress': True,
+            # Continua arquivos .part deixados por uma execução interrompida
+            'continuedl': True,
             'noplaylist': True  # Garantindo que apenas o vídeo único seja baixado
         }
 
         return options
 
     def are_downloads_active(self) -> bool:
-        """Verifica se há downloads ativos."""
+        """Verifica se há downloads ativos ou lotes ainda sendo listados."""
         with self.lock:
-            return len(self.active_downloads) > 0
-
-    def download_media(self, youtube_url: str, title: str, is_audio: bool, quality: str, progress_callback):
-        """Baixa mídia do YouTube e atualiza o progresso."""
-        download_opts = self.get_download_options(title, is_audio, quality)
+            return len(self.jobs) > 0 or any(not batch.finished.is_set() for batch in self.batches.values())
 
-        progress = Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            DownloadColumn(),
-            TransferSpeedColumn(),
-            TimeRemainingColumn(),
-        )
-
-        task = progress.add_task(f"[cyan]Baixando: {title}", total=100)
+    def find_job(self, youtube_url: str, format_type: Optional[str] = None) -> Optional[DownloadJob]:
+        """Localiza um job na fila ou em execução pelo ID do vídeo da URL (e, opcionalmente, pelo formato)."""
+        video_id = extract_video_id(youtube_url)
+        with self.lock:
+            for job in self.jobs.values():
+                if job.cancelled or (format_type and job.format_type != format_type):
+                    continue
+                if (video_id and job.video_id == video_id) or job.youtube_url == youtube_url:
+                    return job
+        return None
+
+    def get_jobs(self, job_ids: Iterable[str]) -> List[DownloadJob]:
+        """Retorna os jobs ainda registrados entre os IDs informados."""
+        with self.lock:
+            return [self.jobs[job_id] for job_id in job_ids if job_id in self.jobs]
+
+    def _find_active_job(self, video_id: str, format_type: str) -> Optional[DownloadJob]:
+        """Procura um job ativo do mesmo vídeo e formato (chamar com self.lock adquirido)."""
+        for job in self.jobs.values():
+            if job.video_id == video_id and job.format_type == format_type and job.active and not job.cancelled:
+                return job
+        return None
+
+    def _find_cancelling_job(self, video_id: str, format_type: str) -> Optional[DownloadJob]:
+        """Procura um job do mesmo vídeo e formato cancelado cujo worker ainda não terminou (chamar com self.lock)."""
+        for job in self.jobs.values():
+            if job.video_id == video_id and job.format_type == format_type and job.cancelled:
+                return job
+        return None
+
+    def download_media(self, job: DownloadJob):
+        """Baixa mídia do YouTube e atualiza o progresso.
+
+        Para áudio, o worker apenas transfere o arquivo e o entrega ao estágio
+        de pós-processamento, liberando o slot de rede antes da codificação.
+        """
+        import yt_dlp
+        youtube_url, is_audio, quality = job.youtube_url, job.is_audio, job.quality
+        progress_callback = job.progress_callback
+        download_opts = self.get_download_options(job.file_stem, is_audio, quality)
+
+        def check_cancelled(d=None):
+            # Levantar DownloadCancelled dentro de um hook interrompe a transferência do yt-dlp
+            if job.cancelled:
+                raise yt_dlp.utils.DownloadCancelled("Download cancelado pelo usuário.")
+
+        last_percentage = {"value": -1}
 
         def progress_hook(d):
+            check_cancelled()
             if d['status'] == 'downloading':
-                downloaded = d.get('downloaded_bytes', 0)
-                total = d.get('total_bytes', 1)
+                # Só grava o último estado; o barramento publica em intervalos fixos
+                self.progress_events.update(job.job_id, **transfer_fields(d))
+                downloaded = d.get('downloaded_bytes') or 0
+                total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
 
                 # Proteção contra divisão por zero
                 if total > 0:
-                    percentage = (downloaded / total) * 95  # Limite em 95%
-                    progress.update(task, completed=int(min(percentage, 95)))
-                    progress_callback(min(int(percentage), 95))  # Garantir que o valor do callback de progresso seja limitado a 95
+                    percentage = min(int((downloaded / total) * 95), 95)  # Limite em 95%
+                    if percentage != last_percentage["value"]:
+                        # Notifica os solicitantes apenas quando o percentual muda
+                        last_percentage["value"] = percentage
+                        progress_callback(percentage)
 
-        download_opts['progress_hooks'] = [progress_hook]
+        def throttle(nbytes: int):
+            self.bandwidth_limiter.consume(job.job_id, nbytes, cancelled=lambda: job.cancelled)
 
-        try:
-            with Live(Panel(progress), refresh_per_second=10) as live:
-                with yt_dlp.YoutubeDL(download_opts) as ydl:
-                    ydl.download([youtube_url])
+        transferred = {"bytes": 0}
 
+        def throttle_hook(d):
+            # O yt-dlp chama os hooks a cada bloco lido; esperar aqui limita a própria transferência
+            if d['status'] == 'downloading':
+                downloaded = d.get('downloaded_bytes') or 0
+                if downloaded < transferred["bytes"]:
+                    transferred["bytes"] = 0  # Novo formato ou arquivo
+                throttle(downloaded - transferred["bytes"])
+                transferred["bytes"] = downloaded
+
+        download_opts['progress_hooks'] = [progress_hook, throttle_hook]
+        download_opts['postprocessor_hooks'] = [check_cancelled]
+        # Limita o tempo que uma leitura parada pode atrasar o cancelamento
+        download_opts['socket_timeout'] = DOWNLOAD_SOCKET_TIMEOUT
+        download_opts['concurrent_fragment_downloads'] = self.segmented_downloader.connections_per_job
+
+        handed_off = False
+        try:
+            check_cancelled()
+            job.state = "downloading"
+            self.bandwidth_limiter.register(job.job_id, weight_for_priority(job.priority))
             # Determina o caminho final do arquivo com base em ser áudio ou vídeo
-            final_file_path = os.path.join(DOWNLOAD_DIRECTORY, self.sanitize_filename(title))
+            final_file_path = os.path.join(DOWNLOAD_DIRECTORY, job.file_stem)
             if is_audio:
                 final_file_path += ".mp3"
             else:
                 final_file_path += ".mp4"  # Supondo que os arquivos de vídeo sejam salvos como .mp4
 
-            # Se o arquivo baixado for áudio, adicione metadados
-            if is_audio:
-                video_info = self.extract_video_info(youtube_url)
-                self.add_metadata_to_mp3(final_file_path, video_info)
+            with yt_dlp.YoutubeDL(download_opts) as ydl:
+                downloaded_path = self.fetch_media(ydl, job, final_file_path, progress_hook, throttle)
 
-            # Atualiza a barra de progresso para 100% após todas as tarefas pós-download
-            progress.update(task, completed=100)  # Define o progresso para 100%
-            progress_callback(100)  # Garantir que o valor do callback de progresso seja 100 agora
+            check_cancelled()
+            job.output_path = final_file_path if is_audio else downloaded_path
 
-            console.print(Panel(f"[bold green]Download concluído: {title}[/bold green]"))
+            # Se o arquivo baixado for áudio, a codificação e os metadados ficam com o pool de pós-processamento
+            if is_audio:
+                job.state = "postprocessing"
+                video_info = self.extract_video_info(youtube_url)
+                # A capa é baixada enquanto o áudio é codificado
+                self.tagger.thumbnails.prefetch(video_info.get("thumbnail"))
+                self.postprocessing_pool.submit(
+                    job, downloaded_path, final_file_path, video_info,
+                    self.add_metadata_to_mp3, lambda error: self.finish_postprocessing(job, error)
+                )
+                handed_off = True
+            else:
+                self.complete_job(job)
+            self.concurrency.record_result()
 
         except Exception as e:
-            console.print(Panel(f"[bold red]Erro durante o download: {str(e)}[/bold red]"))
+            if not job.cancelled:
+                job.state = "failed"
+                self.concurrency.record_result(e)
+                console.print(Panel(f"[bold red]Erro durante o download: {str(e)}[/bold red]"))
         finally:
-            with self.lock:
-                self.active_downloads.pop(youtube_url, None)
-            self.process_download_queue()
+            self.bandwidth_limiter.unregister(job.job_id)
+            if not handed_off:
+                # Os arquivos são limpos antes de o job sair do registro: enquanto isso,
+                # um novo pedido do mesmo vídeo aguarda em vez de criar arquivos com o mesmo nome
+                if job.cancelled:
+                    self.finish_cancelled_job(job)
+                with self.lock:
+                    self.jobs.pop(job.job_id, None)
+                if job.state != "done":
+                    self.release_followers(job)
+
+    def fetch_media(self, ydl, job: DownloadJob, final_file_path: str, progress_hook, throttle) -> str:
+        """Resolve os formatos e escolhe o modo de transferência; retorna o caminho do arquivo baixado."""
+        # A extração roda no pool de processos (ou vem do cache); aqui só se escolhe o formato deste job
+        with metrics.stage("resolve", job):
+            resolved_info = self.resolve_video(job.youtube_url)
+            if not resolved_info:
+                raise RuntimeError("Falha ao extrair informações do vídeo.")
+            info = ydl.process_ie_result(resolved_info, download=False)
+
+        # Áudio em streaming: codifica durante a transferência, sem arquivo intermediário
+        if job.is_audio and self.stream_audio and can_stream(info):
+            with metrics.stage("transfer", job):
+                stream_to_mp3(info, final_file_path, progress_hook, throttle)
+            return final_file_path
+
+        # Arquivos HTTP simples: várias conexões por faixa (Range), dentro do orçamento global
+        formats = info.get("requested_formats") or [info]
+        if self.segmented_downloads and all(can_segment(format_info) for format_info in formats):
+            base_path = os.path.splitext(final_file_path)[0]
+            with metrics.stage("transfer", job):
+                if len(formats) == 1:
+                    output_path = f"{base_path}.{info['ext']}"
+                    return self.segmented_downloader.download(
+                        info["url"], output_path, info.get("http_headers"), progress_hook, throttle=throttle)
+
+                part_paths = [
+                    self.segmented_downloader.download(
+                        format_info["url"], f"{base_path}.f{format_info['format_id']}.{format_info['ext']}",
+                        format_info.get("http_headers"), progress_hook, throttle=throttle)
+                    for format_info in formats
+                ]
+            with metrics.stage("merge", job):
+                merge_formats(part_paths, final_file_path)
+            return final_file_path
+
+        # Demais casos (DASH/HLS fragmentado): o yt-dlp baixa, com fragmentos em paralelo
+        with metrics.stage("transfer", job):
+            info = ydl.process_ie_result(info, download=True)
+        return self.get_downloaded_path(ydl, info)
 
-    def handle_download_request(self, youtube_url: str, format_type: str, quality: str, progress_callback) -> tuple:
-        """Gerencia uma solicitação de download."""
+    @staticmethod
+    def get_downloaded_path(ydl, info: Dict[str, Any]) -> str:
+        """Retorna o caminho do arquivo efetivamente gravado pelo yt-dlp."""
+        requested_downloads = info.get("requested_downloads") or []
+        if requested_downloads and requested_downloads[0].get("filepath"):
+            return requested_downloads[0]["filepath"]
+        return ydl.prepare_filename(info)
+
+    def finish_postprocessing(self, job: DownloadJob, error: Optional[BaseException]):
+        """Conclui o job depois que o pool de pós-processamento termina (ou falha)."""
+        if job.cancelled:
+            self.finish_cancelled_job(job)
+        with self.lock:
+            self.jobs.pop(job.job_id, None)
+        if job.cancelled:
+            self.release_followers(job)
+        elif error is not None:
+            job.state = "failed"
+            console.print(Panel(f"[bold red]Erro no pós-processamento de {job.title}: {error}[/bold red]"))
+            self.release_followers(job)
+        else:
+            self.complete_job(job)
+
+    def complete_job(self, job: DownloadJob):
+        """Marca o job como concluído e notifica o progresso final."""
+        with self.lock:
+            job.state = "done"
+        if job.output_path:
+            self.library.add(job.video_id, job.format_type, job.output_path, job.title)
+        self.archive.add(job.video_id, job.format_type)
+        job.progress_callback(100)  # Garantir que o valor do callback de progresso seja 100 agora
+        console.print(Panel(f"[bold green]Download concluído: {job.title}[/bold green]"))
+        self.release_followers(job, job.output_path)
+
+    def release_followers(self, job: DownloadJob, source_path: Optional[str] = None):
+        """Libera os jobs que aguardavam este: o áudio de um vídeo ou um novo pedido após um cancelamento.
+
+        Com o vídeo pronto, o áudio é extraído localmente; se o vídeo falhou ou
+        foi cancelado, os jobs voltam para a fila de downloads normal.
+        """
+        with self.lock:
+            followers, job.followers = job.followers, []
+        for follower in followers:
+            if follower.cancelled:
+                # Cancelado enquanto aguardava: sai do registro e o barramento publica o estado final
+                with self.lock:
+                    self.jobs.pop(follower.job_id, None)
+                    follower.state = "cancelled"
+                continue
+            if source_path:
+                self.start_local_audio_extraction(follower, source_path)
+                continue
+            try:
+                follower.state = "queued"
+                self.scheduler.submit(follower)
+            except QueueFullError as e:
+                with self.lock:
+                    self.jobs.pop(follower.job_id, None)
+                follower.state = "failed"
+                console.print(Panel(f"[bold yellow]{e}[/bold yellow]"))
+
+    def start_local_audio_extraction(self, job: DownloadJob, source_path: str):
+        """Gera o MP3 a partir de um vídeo já baixado, sem nova transferência pela rede."""
+        job.state = "postprocessing"
+        job.output_path = os.path.join(DOWNLOAD_DIRECTORY, f"{job.file_stem}.{OUTPUT_FORMATS['audio']}")
+        console.print(Panel(f"[bold blue]Extraindo o áudio do vídeo local: {job.title}[/bold blue]"))
+        video_info = self.extract_video_info(job.youtube_url)
+        self.tagger.thumbnails.prefetch(video_info.get("thumbnail"))
+        self.postprocessing_pool.submit(
+            job, source_path, job.output_path, video_info,
+            self.add_metadata_to_mp3, lambda error: self.finish_postprocessing(job, error), keep_source=True
+        )
+
+    def finish_cancelled_job(self, job: DownloadJob):
+        """Remove os arquivos parciais de um job cancelado e registra a latência até liberar o slot."""
+        job.state = "cancelled"
+        removed_files = self.remove_partial_files(job.file_stem, job.is_audio)
+        latency = time.monotonic() - job.cancel_requested_at
+        self.cancel_latencies.append(latency)
+        console.print(Panel(
+            f"[bold yellow]Download cancelado: {job.title} "
+            f"(slot liberado em {latency * 1000:.0f} ms, {removed_files} arquivo(s) temporário(s) removido(s))[/bold yellow]"
+        ))
+
+    def remove_partial_files(self, file_stem: str, is_audio: bool) -> int:
+        """Apaga os arquivos .part, fragmentos e intermediários deixados por um download interrompido."""
+        base_path = os.path.join(DOWNLOAD_DIRECTORY, file_stem)
+        output_extension = OUTPUT_FORMATS['audio'] if is_audio else OUTPUT_FORMATS['video']
+        # O arquivo final só é removido se este job o criou (a existência é checada antes de enfileirar)
+        leftovers = {f".{output_extension}", ".m4a"} if is_audio else {f".{output_extension}"}
+
+        removed_files = 0
+        for path in glob.glob(glob.escape(base_path) + ".*"):
+            name = os.path.basename(path)
+            if is_temporary_file(name) or os.path.splitext(name)[1] in leftovers:
+                try:
+                    os.remove(path)
+                    removed_files += 1
+                except OSError:
+                    pass
+        return removed_files
+
+    def collect_metrics(self) -> list:
+        """Amostras lidas dos componentes no momento da exportação do /metrics."""
+        cache_stats = self.metadata_cache.stats
+        samples = [
+            ("ytvd_queue_depth", "gauge", {}, self.scheduler.queued_count),
+            ("ytvd_running_jobs", "gauge", {}, len(self.scheduler.running_jobs())),
+            ("ytvd_concurrency_limit", "gauge", {}, self.scheduler.limit),
+            ("ytvd_postprocess_backlog", "gauge", {}, self.postprocessing_pool.backlog),
+            ("ytvd_downloaded_bytes_total", "counter", {}, self.bandwidth_limiter.consumed_bytes),
+            ("ytvd_throughput_bytes_per_second", "gauge", {}, self.concurrency.throughput),
+            ("ytvd_library_files", "gauge", {}, self.library.count()),
+        ]
+        samples += [
+            ("ytvd_metadata_cache_total", "counter", {"result": result}, cache_stats.get(result, 0))
+            for result in ("memory_hits", "disk_hits", "misses", "expired", "evictions")
+        ]
+        samples += [
+            ("ytvd_thumbnail_cache_total", "counter", {"result": result}, count)
+            for result, count in self.tagger.thumbnails.stats.items()
+        ]
+        return samples
+
+    def get_cancel_stats(self) -> Dict[str, Any]:
+        """Resume a latência entre o pedido de cancelamento e a liberação do slot."""
+        latencies = sorted(self.cancel_latencies)
+        if not latencies:
+            return {"count": 0}
+        return {
+            "count": len(latencies),
+            "mean_ms": sum(latencies) / len(latencies) * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+        }
+
+    def handle_download_request(self, youtube_url: str, format_type: str, quality: str, progress_callback,
+                                priority: Optional[int] = None, source: str = "window") -> tuple:
+        """Gerencia uma solicitação de download.
+
+        Pedidos do mesmo vídeo e formato se anexam ao job em andamento, e o
+        áudio de um vídeo já baixado (ou em download) é extraído localmente.
+        """
+        is_audio = format_type == "audio"
+        video_id = extract_video_id(youtube_url)
+
+        # Consulta o índice da biblioteca antes de qualquer acesso à rede
+        if self.is_file_downloaded(video_id, is_audio):
+            return self.already_downloaded_response()
+        attached = self.attach_to_active_job(video_id, format_type, progress_callback)
+        if attached:
+            return attached
+
+        extract_started_at = time.perf_counter()
         video_info = self.extract_video_info(youtube_url)
+        extract_seconds = time.perf_counter() - extract_started_at
         if not video_info:
             error_message = "Falha ao extrair informações do vídeo. Por favor, verifique a URL."
             console.print(Panel(f"[bold red]{error_message}[/bold red]"))
@@ -185,48 +562,294 @@ class DownloadManager:
 
         title = video_info['title']
         sanitized_title = self.sanitize_filename(title)
-        is_audio = format_type == "audio"
+        video_id = video_info.get("id") or video_id
+
+        if self.is_file_downloaded(video_id, is_audio, sanitized_title):
+            return self.already_downloaded_response()
 
-        if self.is_file_downloaded(sanitized_title, is_audio):
-            error_message = "Arquivo já baixado."
-            console.print(Panel(f"[bold yellow]{error_message}[/bold yellow]"))
-            return {"error": error_message}, 409
+        job = DownloadJob(youtube_url, video_id, title, is_audio,
+                          quality, progress_callback, priority=priority, source=source)
+        # Inclui os acertos de cache; o histograma de "extract" mede só as extrações reais
+        job.timings["extract"] = extract_seconds
+        return self.enqueue_job(job, progress_callback)
 
+    def enqueue_job(self, job: DownloadJob, progress_callback=None) -> tuple:
+        """Registra um job novo e o encaminha.
+
+        Se já houver um job idêntico, o solicitante se anexa a ele; o áudio de
+        um vídeo em download aguarda o vídeo, o de um vídeo já na biblioteca
+        é extraído localmente, e o restante entra na fila.
+        """
+        video_id, format_type, title = job.video_id, job.format_type, job.title
         with self.lock:
-            if len(self.active_downloads) < MAX_CONCURRENT_DOWNLOADS:
-                self.active_downloads[youtube_url] = {"title": title, "status": "downloading"}
-                threading.Thread(target=self.download_media, args=(youtube_url, title, is_audio, quality, progress_callback)).start()
-                message = "Download iniciado."
+            existing_job = self._find_active_job(video_id, format_type)
+            if existing_job is None:
+                self.assign_file_stem(job)
+                self.jobs[job.job_id] = job
+                # Um job idêntico ainda sendo cancelado: este só começa depois que os arquivos dele forem limpos
+                cancelling_job = self._find_cancelling_job(video_id, format_type)
+                video_job = cancelling_job or (self._find_active_job(video_id, "video") if job.is_audio else None)
+                if video_job is not None:
+                    job.state = "waiting"
+                    video_job.followers.append(job)
+        if existing_job is not None:
+            return self.attach_to_active_job(video_id, format_type, progress_callback)
+        self.progress_events.track(job)
+        self.job_store.save(job)
+        if job.state == "waiting":
+            message = ("Aguardando o cancelamento anterior deste download terminar." if cancelling_job
+                       else "Aguardando o download do vídeo para extrair o áudio.")
+            console.print(Panel(f"[bold blue]{message} Título: {title}[/bold blue]"))
+            return {"message": message, "title": title, "position": 0, "job_id": job.job_id}, 202
+
+        # Áudio de um vídeo que já está na biblioteca: extração local
+        video_path = self.library.find(video_id, "video") if job.is_audio else None
+        if video_path and os.path.exists(video_path):
+            self.start_local_audio_extraction(job, video_path)
+            return {"message": "Extraindo áudio do vídeo já baixado.", "title": title, "position": 0,
+                    "job_id": job.job_id}, 202
+
+        try:
+            position = self.scheduler.submit(job)
+        except QueueFullError as e:
+            with self.lock:
+                self.jobs.pop(job.job_id, None)
+            job.state = "failed"
+            console.print(Panel(f"[bold yellow]{e}[/bold yellow]"))
+            return {"error": str(e)}, 429
+
+        message = "Download na fila." if position else "Download iniciado."
+        console.print(Panel(f"[bold blue]{message} Título: {title}[/bold blue]"))
+        return {"message": message, "title": title, "position": position, "job_id": job.job_id}, 202
+
+    def assign_file_stem(self, job: DownloadJob):
+        """Define o nome do arquivo do job (chamar com self.lock adquirido).
+
+        O nome vem do título; se ele já pertence a outro vídeo (na biblioteca
+        ou em um job ativo), o ID do vídeo é acrescentado para não sobrescrever
+        o arquivo existente.
+        """
+        stem = self.sanitize_filename(job.title)
+        taken = self.library.is_stem_taken(stem, job.format_type, job.video_id) or any(
+            other.file_stem == stem and other.format_type == job.format_type and other.video_id != job.video_id
+            for other in self.jobs.values()
+        )
+        job.file_stem = f"{stem} [{job.video_id}]" if taken and job.video_id else stem
+
+    def restore_jobs(self) -> int:
+        """Recoloca na fila os jobs interrompidos na execução anterior.
+
+        Os downloads em faixas continuam a partir dos .part e dos seus
+        checkpoints, e os do yt-dlp a partir dos .part e .ytdl; o que já
+        estava na biblioteca é descartado do registro.
+        """
+        restored = 0
+        for row in self.job_store.pending():
+            is_audio = row["format"] == "audio"
+            if row["state"] == "cancelling":
+                # Cancelado pelo usuário, mas o programa fechou antes de o worker terminar
+                self.job_store.remove(row["job_id"])
+                continue
+            if self.is_file_downloaded(row["video_id"], is_audio, self.sanitize_filename(row["title"])):
+                self.job_store.remove(row["job_id"])
+                continue
+            job = DownloadJob(row["url"], row["video_id"], row["title"], is_audio, row["quality"],
+                              priority=row["priority"], source=row["source"])
+            job.job_id = row["job_id"]
+            job.created_at = row["created_at"]
+            _, status_code = self.enqueue_job(job)
+            if status_code == 202:
+                restored += 1
             else:
-                self.download_queue.put((youtube_url, title, is_audio, quality))
-                message = "Download na fila."
+                self.job_store.remove(row["job_id"])
+        if restored:
+            console.print(Panel(f"[bold blue]{restored} download(s) interrompido(s) retomado(s).[/bold blue]"))
+        return restored
+
+    def attach_to_active_job(self, video_id: Optional[str], format_type: str, progress_callback) -> Optional[tuple]:
+        """Anexa o solicitante a um job idêntico em andamento, se houver."""
+        if not video_id:
+            return None
+        with self.lock:
+            job = self._find_active_job(video_id, format_type)
+            if job is None:
+                return None
+            job.add_progress_callback(progress_callback)
+        message = "Download já em andamento."
+        console.print(Panel(f"[bold blue]{message} Título: {job.title}[/bold blue]"))
+        return {"message": message, "title": job.title, "position": self.scheduler.positions().get(job.job_id, 0),
+                "job_id": job.job_id}, 202
+
+    def start_batch(self, url: str, format_type: str, quality: str = 'best', source: str = "batch",
+                    on_job=None, batch_class=BatchDownload, **options) -> BatchDownload:
+        """Inicia o download de todos os vídeos de uma playlist ou canal."""
+        batch = batch_class(self, url, format_type, quality, source=source, on_job=on_job, **options)
+        with self.lock:
+            # Descarta os lotes finalizados mais antigos, mantendo só um histórico curto
+            finished = [batch_id for batch_id, other in self.batches.items() if other.finished.is_set()]
+            for batch_id in finished[:max(0, len(finished) - BATCH_HISTORY_SIZE + 1)]:
+                del self.batches[batch_id]
+            self.batches[batch.batch_id] = batch
+        return batch.start()
+
+    def sync(self, url: str, format_type: str, quality: str = 'best', source: str = "sync", on_job=None) -> SyncBatch:
+        """Baixa só os vídeos de um canal ou playlist que ainda não estão no arquivo de downloads."""
+        return self.start_batch(url, format_type, quality, source=source, on_job=on_job, batch_class=SyncBatch)
+
+    def get_batches_status(self) -> Dict[str, Any]:
+        with self.lock:
+            batches = list(self.batches.values())
+        return {"batches": [batch.get_status() for batch in batches]}
 
-            console.print(Panel(f"[bold blue]{message} Título: {title}[/bold blue]"))
-            return {"message": message, "title": title, "position": self.download_queue.qsize()}, 202
+    def cancel_batch(self, batch_id: str) -> tuple:
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return {"error": "Lote não encontrado."}, 404
+        batch.cancel()
+        return batch.get_status(), 200
+
+    def submit_download_request(self, youtube_url: str, format_type: str, quality: str = 'best', progress_callback=None,
+                                source: str = "extension") -> tuple:
+        """Aceita uma solicitação de download e a processa em segundo plano, sem aguardar a extração."""
+        if format_type not in OUTPUT_FORMATS:
+            return {"error": f"Formato inválido: {format_type}"}, 400
+        if is_collection_url(youtube_url):
+            batch = self.start_batch(youtube_url, format_type, quality, source=f"{source}-batch")
+            return {"message": "Lote recebido.", "batch_id": batch.batch_id}, 202
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            return {"error": "URL de vídeo do YouTube inválida."}, 400
+
+        with self.lock:
+            if (video_id, format_type) in self.pending_requests:
+                return {"message": "Download já solicitado.", "video_id": video_id}, 202
+            self.pending_requests[(video_id, format_type)] = youtube_url
 
-    def process_download_queue(self):
-        """Processa a fila de downloads se houver slots ativos disponíveis."""
-        if not self.download_queue.empty() and len(self.active_downloads) < MAX_CONCURRENT_DOWNLOADS:
-            youtube_url, title, is_audio, quality = self.download_queue.get()
+        self.request_executor.submit(
+            self._process_download_request, video_id, youtube_url, format_type, quality, progress_callback, source
+        )
+        return {"message": "Pedido de download recebido.", "video_id": video_id}, 202
+
+    def _process_download_request(self, video_id: str, youtube_url: str, format_type: str, quality: str,
+                                  progress_callback, source: str):
+        """Executa em segundo plano uma solicitação aceita por submit_download_request."""
+        try:
+            self.handle_download_request(youtube_url, format_type, quality, progress_callback, source=source)
+        except Exception as e:
+            console.print(Panel(f"[bold red]Erro ao processar a solicitação de download: {e}[/bold red]"))
+        finally:
             with self.lock:
-                self.active_downloads[youtube_url] = {"title": title, "status": "downloading"}
-            threading.Thread(target=self.download_media, args=(youtube_url, title, is_audio, quality)).start()
+                self.pending_requests.pop((video_id, format_type), None)
+
+    def get_cached_video_info(self, youtube_url: str) -> Dict[str, Any]:
+        """Retorna os metadados já em cache, sem acessar a rede."""
+        video_id = extract_video_id(youtube_url)
+        return (self.metadata_cache.get(video_id) or {}) if video_id else {}
+
+    def prefetch_video_info(self, youtube_url: str) -> Optional[Future]:
+        """Adianta em segundo plano a extração do vídeo (metadados e lista de formatos).
+
+        Retorna o Future da tarefa, que pode ser cancelado enquanto ainda não
+        começou (ex.: o usuário saiu da página), ou None se não há o que fazer.
+        """
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            return None
+        with self.lock:
+            resolved = self.resolved_infos.get(video_id)
+            if video_id in self.prefetching or (resolved and time.monotonic() - resolved[0] <= RESOLVED_INFO_TTL):
+                return None
+            self.prefetching.add(video_id)
+
+        def prefetch():
+            try:
+                self.resolve_video(youtube_url)
+                self.extract_video_info(youtube_url)
+            finally:
+                with self.lock:
+                    self.prefetching.discard(video_id)
+
+        future = self.request_executor.submit(prefetch)
+
+        def discard_if_cancelled(completed: Future):
+            if completed.cancelled():
+                with self.lock:
+                    self.prefetching.discard(video_id)
+
+        future.add_done_callback(discard_if_cancelled)
+        return future
+
+    def is_downloading(self, youtube_url: str) -> bool:
+        """Verifica se o vídeo está sendo processado, baixado ou aguardando na fila."""
+        video_id = extract_video_id(youtube_url)
+        if not video_id:
+            return False
+        with self.lock:
+            if any(pending_id == video_id for pending_id, _ in self.pending_requests):
+                return True
+        return self.find_job(youtube_url) is not None
+
+    def get_queue_status(self) -> Dict[str, Any]:
+        """Retorna os jobs em execução e a posição atual de cada job na fila."""
+        running = [job.to_dict() for job in self.scheduler.running_jobs()]
+        queued = [
+            {**job.to_dict(), "position": position}
+            for position, job in enumerate(self.scheduler.queued_jobs(), start=1)
+        ]
+        return {"running": running, "queued": queued}
+
+    def is_file_downloaded(self, video_id: Optional[str], is_audio: bool, title: Optional[str] = None) -> bool:
+        """Verifica no índice da biblioteca se o vídeo já foi baixado no formato pedido.
+
+        O título sanitizado, se informado, cobre arquivos antigos sem o ID gravado.
+        """
+        format_type = "audio" if is_audio else "video"
+        if video_id and self.library.contains(video_id, format_type):
+            return True
+        return bool(title) and self.library.contains_stem(title, format_type)
 
-    def is_file_downloaded(self, title: str, is_audio: bool) -> bool:
-        """Verifica se um arquivo já foi baixado."""
-        file_extension = OUTPUT_FORMATS['audio'] if is_audio else OUTPUT_FORMATS['video']
-        return os.path.exists(os.path.join(DOWNLOAD_DIRECTORY, f"{title}.{file_extension}"))
+    @staticmethod
+    def already_downloaded_response() -> tuple:
+        error_message = "Arquivo já baixado."
+        console.print(Panel(f"[bold yellow]{error_message}[/bold yellow]"))
+        return {"error": error_message}, 409
 
-    def cancel_download(self, youtube_url: str) -> tuple:
+    def cancel_download(self, youtube_url: str, format_type: Optional[str] = None) -> tuple:
         """Cancela um download em andamento ou o remove da fila."""
+        job = self.find_job(youtube_url, format_type)
+        if job is None:
+            message = "Nenhum download ativo encontrado com a URL fornecida."
+            console.print(Panel(f"[bold yellow]{message}[/bold yellow]"))
+            return {"error": message}, 404
+
         with self.lock:
-            if youtube_url in self.active_downloads:
-                self.active_downloads.pop(youtube_url, None)
-                self.process_download_queue()
-                message = "Download cancelado com sucesso"
-                console.print(Panel(f"[bold green]{message}[/bold green]"))
-                return {"message": message}, 200
-            else:
-                message = "Nenhum download ativo encontrado com a URL fornecida."
-                console.print(Panel(f"[bold yellow]{message}[/bold yellow]"))
-                return {"error": message}, 404
+            if job.job_id not in self.jobs or not job.active:
+                # Terminou entre a busca e o cancelamento: não há o que interromper
+                return {"message": "O download já foi finalizado.", "job_id": job.job_id}, 200
+            leader = next((other for other in self.jobs.values() if job in other.followers), None)
+            if leader is not None:
+                leader.followers.remove(job)
+            # Marcado antes de sinalizar o worker, para não sobrescrever o "cancelled" gravado por ele
+            job.state = "cancelling"
+            job.cancel()
+        self.postprocessing_pool.cancel(job.job_id)
+
+        stopped = True
+        if leader is not None:
+            # Aguardava outro job: sai da espera e é publicado como finalizado (barramento e registro)
+            message = "Download removido da espera."
+        elif self.scheduler.remove(job.job_id):
+            # Ainda não tinha começado: nada a interromper
+            message = "Download removido da fila."
+        else:
+            # O worker percebe o sinal no próximo hook de progresso e libera o slot; o job
+            # continua registrado (e bloqueia pedidos idênticos) até os arquivos parciais serem limpos
+            message = "Download cancelado com sucesso"
+            stopped = False
+        if stopped:
+            with self.lock:
+                self.jobs.pop(job.job_id, None)
+                job.state = "cancelled"
+        console.print(Panel(f"[bold green]{message}[/bold green]"))
+        return {"message": message, "job_id": job.job_id}, 200
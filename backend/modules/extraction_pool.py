@@ -0,0 +1,129 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+from rich.panel import Panel
+from .constants import EXTRACTION_PROCESSES, EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, EXTRACTION_TIMEOUT_RESET
+from .rich_console import console
+
+# Instância do YoutubeDL mantida viva em cada processo (ou thread) de extração
+_worker_state = threading.local()
+
+
+class ExtractionError(Exception):
+    """Falha ao extrair um vídeo; carrega só a mensagem, para atravessar processos sem problemas de pickle."""
+
+
+def _get_ydl():
+    ydl = getattr(_worker_state, "ydl", None)
+    if ydl is None:
+        import yt_dlp
+        ydl = _worker_state.ydl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
+    return ydl
+
+
+def _init_worker():
+    """Aquece o processo: importa o yt-dlp e cria o YoutubeDL antes do primeiro pedido."""
+    _get_ydl()
+
+
+def _ping() -> bool:
+    return True
+
+
+def extract_info(youtube_url: str) -> Dict[str, Any]:
+    """Extrai a página do vídeo sem processar os formatos e retorna um dicionário serializável."""
+    ydl = _get_ydl()
+    try:
+        info = ydl.extract_info(youtube_url, download=False, process=False)
+    except Exception as e:
+        raise ExtractionError(str(e)) from None
+    # sanitize_info remove objetos não serializáveis (geradores, funções) do resultado
+    return ydl.sanitize_info(info, remove_private_keys=False) if info else {}
+
+
+class ExtractionPool:
+    """Pool de processos dedicados à extração (análise da página e decifragem de assinaturas).
+
+    A extração é pesada em CPU; em processos separados ela não disputa o GIL
+    com o loop do Qt e escala entre os núcleos. Cada processo mantém um
+    YoutubeDL já criado. Os processos são iniciados com "spawn", já que fazer
+    fork de um processo com Qt e várias threads não é seguro. Se o pool
+    quebrar ou estiver desativado, a extração roda na própria thread. Uma
+    extração que passa do tempo limite falha com ExtractionError; se isso se
+    repete, os processos provavelmente estão travados e o pool é recriado.
+    """
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, use_processes: bool = EXTRACTION_PROCESSES,
+                 timeout: float = EXTRACTION_TIMEOUT, timeout_reset: int = EXTRACTION_TIMEOUT_RESET):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.timeout = timeout
+        self.timeout_reset = timeout_reset
+        self.lock = threading.Lock()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.consecutive_timeouts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self.executor
+
+    def warm_up(self):
+        """Inicia um processo de extração antes do primeiro pedido.
+
+        Com "spawn", o pool só cria novos processos quando não há um ocioso,
+        então os demais sobem conforme os pedidos simultâneos aparecem.
+        """
+        if self.use_processes:
+            self._get_executor().submit(_ping)
+
+    def extract(self, youtube_url: str) -> Dict[str, Any]:
+        """Extrai o vídeo em um processo do pool (ou na thread atual, como alternativa)."""
+        if not self.use_processes:
+            return extract_info(youtube_url)
+        executor = self._get_executor()
+        future = executor.submit(extract_info, youtube_url)
+        try:
+            info = future.result(self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self.lock:
+                self.consecutive_timeouts += 1
+                reset = self.consecutive_timeouts >= self.timeout_reset and self.executor is executor
+                if reset:
+                    self.executor = None
+                    self.consecutive_timeouts = 0
+            if reset:
+                console.print(Panel("[bold yellow]Extrações seguidas sem resposta; recriando o pool de extração.[/bold yellow]"))
+                self._terminate(executor)
+            raise ExtractionError(f"A extração não terminou em {self.timeout:g} segundos.") from None
+        except BrokenProcessPool:
+            console.print(Panel("[bold yellow]Pool de extração interrompido; recriando e extraindo localmente.[/bold yellow]"))
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = None
+            return extract_info(youtube_url)
+        with self.lock:
+            self.consecutive_timeouts = 0
+        return info
+
+    @staticmethod
+    def _terminate(executor: ProcessPoolExecutor):
+        """Encerra um pool descartado, matando os processos travados em vez de esperar por eles."""
+        # O ProcessPoolExecutor não oferece como interromper uma tarefa em andamento
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,27 @@
+import threading
+
+
+class LazySession:
+    """Sessão HTTP keep-alive compartilhada entre threads, criada no primeiro uso.
+
+    O requests só é carregado quando a sessão é usada pela primeira vez,
+    para não pesar na inicialização do programa.
+    """
+
+    def __init__(self, pool_connections: int, pool_maxsize: int):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.lock = threading.Lock()
+        self._session = None
+
+    def get(self):
+        with self.lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
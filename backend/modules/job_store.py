@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List
+from rich.panel import Panel
+from .constants import CACHE_DIRECTORY
+from .progress_events import TERMINAL_STATES
+from .rich_console import console
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    video_id TEXT,
+    title TEXT NOT NULL,
+    format TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    state TEXT NOT NULL,
+    downloaded_bytes INTEGER,
+    total_bytes INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class JobStore:
+    """Registro durável dos jobs aceitos, para retomá-los após fechar o programa ou uma falha.
+
+    Cada job é gravado ao ser aceito; depois, os retratos do barramento de
+    progresso atualizam o estado e os bytes transferidos (no máximo uma
+    transação por publicação) e apagam os jobs que terminaram. O banco usa
+    WAL, então as gravações não bloqueiam as leituras.
+    """
+
+    def __init__(self, db_path: str = os.path.join(CACHE_DIRECTORY, "jobs.sqlite3")):
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def save(self, job):
+        """Grava (ou regrava) um job aceito."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, url, video_id, title, format, quality, priority, source, "
+                "state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.youtube_url, job.video_id, job.title, job.format_type, str(job.quality),
+                 job.priority, job.source, job.state, job.created_at, now),
+            )
+
+    def remove(self, job_id: str):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Jobs que não chegaram ao fim, na ordem em que foram aceitos."""
+        with self.lock:
+            cursor = self.connection.execute("SELECT * FROM jobs ORDER BY created_at")
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def record_snapshot(self, snapshot: List[Dict[str, Any]]):
+        """Assinante do barramento de progresso: atualiza o estado e os bytes de cada job."""
+        now = time.time()
+        finished = [(entry["job_id"],) for entry in snapshot if entry["stage"] in TERMINAL_STATES]
+        # UPDATE (e não INSERT): um job descartado antes de ser gravado não volta ao registro
+        updates = [
+            (entry["stage"], entry.get("downloaded_bytes"), entry.get("total_bytes"), now, entry["job_id"])
+            for entry in snapshot if entry["stage"] not in TERMINAL_STATES
+        ]
+        try:
+            with self.lock, self.connection:
+                self.connection.executemany("DELETE FROM jobs WHERE job_id = ?", finished)
+                self.connection.executemany(
+                    "UPDATE jobs SET state = ?, downloaded_bytes = ?, total_bytes = ?, updated_at = ? WHERE job_id = ?",
+                    updates,
+                )
+        except sqlite3.Error as e:
+            console.print(Panel(f"[bold red]Erro ao gravar o registro de jobs: {e}[/bold red]"))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
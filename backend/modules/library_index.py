@@ -0,0 +1,305 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from rich.panel import Panel
+from .constants import CACHE_DIRECTORY, DOWNLOAD_DIRECTORY, OUTPUT_FORMATS, LIBRARY_WATCH_INTERVAL
+from .rich_console import console
+
+VIDEO_ID_TAG = "YTVD_VIDEO_ID"  # Quadro TXXX gravado nos MP3 com o ID do vídeo
+FORMAT_BY_EXTENSION = {f".{extension}": format_type for format_type, extension in OUTPUT_FORMATS.items()}
+# Sufixos de arquivos ainda em escrita: downloads parciais, checkpoints e saídas do ffmpeg
+TEMPORARY_SUFFIXES = (".part", ".ytdl", ".temp", ".tmp", ".resume")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    stem TEXT NOT NULL,
+    format TEXT NOT NULL,
+    video_id TEXT,
+    title TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_video_format ON files (video_id, format);
+CREATE INDEX IF NOT EXISTS files_stem_format ON files (stem, format);
+CREATE TABLE IF NOT EXISTS metadata (
+    video_id TEXT PRIMARY KEY,
+    info TEXT NOT NULL
+);
+"""
+
+
+def is_temporary_file(name: str) -> bool:
+    """Indica se o nome é de um arquivo intermediário (.part, X.temp.mp3, fragmentos, formatos X.f137.mp4)."""
+    return name.endswith(TEMPORARY_SUFFIXES) or "-Frag" in name or re.search(r"\.(temp|f\d+)\.[^.]+$", name) is not None
+
+
+def library_format(name: str) -> Optional[str]:
+    """Formato de um arquivo da biblioteca pelo nome; None para outros arquivos e temporários."""
+    if is_temporary_file(name):
+        return None
+    return FORMAT_BY_EXTENSION.get(os.path.splitext(name)[1].lower())
+
+
+def read_video_id_tag(path: str) -> Optional[str]:
+    """Lê o ID do vídeo gravado no ID3 de um MP3 (None se ausente)."""
+    try:
+        import eyed3
+        eyed3.log.setLevel("ERROR")
+        audiofile = eyed3.load(path)
+        frame = audiofile.tag.user_text_frames.get(VIDEO_ID_TAG) if audiofile and audiofile.tag else None
+        return frame.text if frame else None
+    except Exception:
+        return None
+
+
+class LibraryIndex:
+    """Índice persistente (SQLite) dos arquivos baixados, por ID do vídeo e formato.
+
+    É alimentado pelos eventos de conclusão de download e por varreduras
+    incrementais da pasta de downloads (apenas arquivos novos ou alterados são
+    lidos). A checagem de duplicatas vira uma consulta indexada, sem acesso à
+    rede nem ao sistema de arquivos.
+    """
+
+    def __init__(self, db_path: str = os.path.join(CACHE_DIRECTORY, "library.sqlite3"),
+                 directory: str = DOWNLOAD_DIRECTORY):
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.watcher: Optional[LibraryWatcher] = None
+
+    # -------------------------------------------------------------- consultas
+
+    def contains(self, video_id: str, format_type: str) -> bool:
+        return self.find(video_id, format_type) is not None
+
+    def find(self, video_id: str, format_type: str) -> Optional[str]:
+        """Retorna o caminho do arquivo do vídeo no formato pedido, se existir."""
+        if not video_id:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT path FROM files WHERE video_id = ? AND format = ? LIMIT 1", (video_id, format_type)
+            ).fetchone()
+        return row[0] if row else None
+
+    def contains_stem(self, stem: str, format_type: str) -> bool:
+        """Procura pelo nome do arquivo (sem extensão), apenas entre arquivos antigos ou sem ID gravado.
+
+        Arquivos com ID pertencem a um vídeo específico: outro vídeo com o
+        mesmo título não é considerado baixado.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM files WHERE stem = ? AND format = ? AND video_id IS NULL LIMIT 1", (stem, format_type)
+            ).fetchone()
+        return row is not None
+
+    def is_stem_taken(self, stem: str, format_type: str, video_id: Optional[str]) -> bool:
+        """Indica se o nome de arquivo já pertence a outro vídeo."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM files WHERE stem = ? AND format = ? AND video_id IS NOT NULL AND video_id != ? LIMIT 1",
+                (stem, format_type, video_id or ""),
+            ).fetchone()
+        return row is not None
+
+    def entries(self, format_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lista os arquivos indexados."""
+        query = "SELECT path, format, video_id, title FROM files"
+        params: Tuple = ()
+        if format_type:
+            query += " WHERE format = ?"
+            params = (format_type,)
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [{"path": path, "format": fmt, "video_id": video_id, "title": title}
+                for path, fmt, video_id, title in rows]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def get_metadata(self, video_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Metadados usados nas tags, guardados sem prazo de validade ao baixar o arquivo."""
+        if not video_id:
+            return None
+        with self.lock:
+            row = self.connection.execute("SELECT info FROM metadata WHERE video_id = ?", (video_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # -------------------------------------------------------------- escrita
+
+    def add(self, video_id: str, format_type: str, path: str, title: Optional[str] = None):
+        """Registra um arquivo recém-baixado."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        stem = os.path.splitext(os.path.basename(path))[0]
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, stem, format, video_id, title, size, mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stem, format_type, video_id, title, stat.st_size, stat.st_mtime),
+            )
+
+    def save_metadata(self, video_id: Optional[str], info: Dict[str, Any]):
+        """Guarda os metadados do vídeo, para refazer as tags depois sem acessar a rede."""
+        if not video_id or not info:
+            return
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO metadata (video_id, info) VALUES (?, ?)",
+                (video_id, json.dumps(info, ensure_ascii=False)),
+            )
+
+    def remove(self, path: str):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM files WHERE path = ?", (os.path.abspath(path),))
+
+    def scan(self) -> Dict[str, int]:
+        """Sincroniza o índice com a pasta, lendo apenas arquivos novos ou alterados."""
+        with self.lock:
+            known = {
+                path: (size, mtime, video_id)
+                for path, size, mtime, video_id in self.connection.execute(
+                    "SELECT path, size, mtime, video_id FROM files")
+            }
+
+        found = set()
+        changed = []
+        for entry in self._walk(self.directory):
+            format_type = library_format(entry.name)
+            if format_type is None:
+                continue
+            path = os.path.abspath(entry.path)
+            stat = entry.stat()
+            found.add(path)
+            previous = known.get(path)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                continue
+            # O ID já conhecido é mantido; MP3 novos têm o ID lido do ID3
+            video_id = previous[2] if previous else None
+            if video_id is None and format_type == "audio":
+                video_id = read_video_id_tag(path)
+            stem = os.path.splitext(entry.name)[0]
+            changed.append((path, stem, format_type, video_id, None, stat.st_size, stat.st_mtime))
+
+        removed = [(path,) for path in known if path not in found]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO files (path, stem, format, video_id, title, size, mtime) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET video_id = COALESCE(excluded.video_id, files.video_id), "
+                "size = excluded.size, mtime = excluded.mtime",
+                changed,
+            )
+            self.connection.executemany("DELETE FROM files WHERE path = ?", removed)
+        return {"added_or_changed": len(changed), "removed": len(removed), "total": len(found)}
+
+    @staticmethod
+    def _walk(directory: str):
+        pending = [directory]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            yield entry
+            except OSError:
+                continue
+
+    # ---------------------------------------------------------- observação
+
+    def start_watching(self, interval: float = LIBRARY_WATCH_INTERVAL):
+        """Faz a varredura inicial e mantém o índice atualizado em segundo plano."""
+        if self.watcher is None:
+            self.watcher = LibraryWatcher(self, interval)
+            self.watcher.start()
+
+    def close(self):
+        if self.watcher:
+            self.watcher.stop()
+        with self.lock:
+            self.connection.close()
+
+
+class LibraryWatcher(threading.Thread):
+    """Observa a pasta de downloads e reindexa quando algo muda.
+
+    Verifica apenas o mtime dos diretórios (que muda ao criar, apagar ou
+    renomear arquivos), então o custo com a pasta parada é de alguns stat()
+    por intervalo, independentemente do número de arquivos. Quando um
+    diretório muda, a lista dos seus arquivos de mídia é comparada com a
+    anterior: mudanças causadas só por temporários (.part, X.temp.mp3) de
+    downloads em andamento não disparam a reindexação.
+    """
+
+    def __init__(self, index: LibraryIndex, interval: float):
+        super().__init__(name="ytvd-library-watcher", daemon=True)
+        self.index = index
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.directory_mtimes: Dict[str, float] = {}
+        self.listings: Dict[str, Dict[str, Tuple[int, float]]] = {}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def snapshot(self) -> Dict[str, float]:
+        mtimes = {}
+        pending = [self.index.directory]
+        while pending:
+            directory = pending.pop()
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime
+                with os.scandir(directory) as entries:
+                    pending.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+        return mtimes
+
+    @staticmethod
+    def listing(directory: str) -> Dict[str, Tuple[int, float]]:
+        """Arquivos de mídia de um diretório, sem temporários, com tamanho e mtime."""
+        files = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if library_format(entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, stat.st_mtime)
+        except OSError:
+            pass
+        return files
+
+    def run(self):
+        while not self.stop_event.is_set():
+            snapshot = self.snapshot()
+            if snapshot != self.directory_mtimes:
+                changed = {directory: self.listing(directory) for directory in snapshot
+                           if snapshot[directory] != self.directory_mtimes.get(directory)}
+                relevant = snapshot.keys() != self.directory_mtimes.keys() or any(
+                    listing != self.listings.get(directory) for directory, listing in changed.items())
+                try:
+                    result = self.index.scan() if relevant else {"added_or_changed": 0, "removed": 0}
+                    self.directory_mtimes = snapshot
+                    self.listings = {directory: self.listings.get(directory, {}) for directory in snapshot}
+                    self.listings.update(changed)
+                    if result["added_or_changed"] or result["removed"]:
+                        console.print(Panel(
+                            f"[bold blue]Biblioteca atualizada: {result['added_or_changed']} novo(s)/alterado(s), "
+                            f"{result['removed']} removido(s), {result['total']} arquivo(s)[/bold blue]"
+                        ))
+                except Exception as e:
+                    console.print(Panel(f"[bold red]Erro ao indexar a biblioteca: {e}[/bold red]"))
+            self.stop_event.wait(self.interval)
@@ -0,0 +1,99 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Callable, Optional, Tuple
+from rich.panel import Panel
+from .constants import RETAG_WORKERS
+from .library_index import LibraryIndex
+from .metadata_cache import MetadataCache
+from .rich_console import console
+from .tagging import Mp3Tagger
+
+
+class LibraryRetagger:
+    """Refaz as tags ID3 dos MP3 da pasta de downloads sem acessar a rede.
+
+    Cada arquivo é associado ao vídeo pelo índice da biblioteca; os metadados
+    vêm dos guardados ao baixar, do cache de metadados (mesmo expirado) ou,
+    na falta deles, das próprias tags do arquivo. As capas só são usadas se
+    já estiverem no cache em disco. Arquivos cujas tags já estão corretas
+    não são regravados, então o custo é dominado pela leitura das tags.
+    """
+
+    def __init__(self, library: LibraryIndex, metadata_cache: Optional[MetadataCache] = None,
+                 tagger: Optional[Mp3Tagger] = None, workers: int = RETAG_WORKERS):
+        self.library = library
+        self.metadata_cache = metadata_cache or MetadataCache()
+        self.tagger = tagger or Mp3Tagger()
+        self.workers = workers
+
+    def find_metadata(self, video_id: Optional[str]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Retorna os metadados do vídeo e a origem deles."""
+        info = self.library.get_metadata(video_id)
+        if info:
+            return info, "library"
+        info = self.metadata_cache.get(video_id, allow_stale=True) if video_id else None
+        if info:
+            return info, "cache"
+        return None, "tag"
+
+    def retag_file(self, entry: Dict[str, Any], dry_run: bool) -> Dict[str, Any]:
+        info, source = self.find_metadata(entry["video_id"])
+        result = {"path": entry["path"], "video_id": entry["video_id"], "source": source, "changes": []}
+        try:
+            result["changes"] = self.tagger.tag(entry["path"], info, offline=True, dry_run=dry_run)
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            return result
+        if not result["changes"]:
+            result["status"] = "unchanged"
+        elif dry_run:
+            result["status"] = "would_update"
+        else:
+            result["status"] = "updated"
+            # Mantém tamanho e mtime do índice em dia, evitando releituras na próxima varredura
+            self.library.add(entry["video_id"], "audio", entry["path"], entry["title"])
+        return result
+
+    def run(self, dry_run: bool = False,
+            progress_callback: Optional[Callable[[Dict[str, Any], int, int], None]] = None) -> Dict[str, Any]:
+        """Refaz as tags de toda a biblioteca de áudio e retorna o relatório.
+
+        progress_callback recebe o resultado de cada arquivo e a contagem
+        (concluídos, total). Com dry_run, nenhum arquivo é alterado.
+        """
+        self.library.scan()
+        entries = self.library.entries("audio")
+        statuses: Counter = Counter()
+        sources: Counter = Counter()
+        fields: Counter = Counter()
+        failures = []
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ytvd-retag") as executor:
+            futures = [executor.submit(self.retag_file, entry, dry_run) for entry in entries]
+            for future in as_completed(futures):
+                result = future.result()
+                completed += 1
+                statuses[result["status"]] += 1
+                sources[result["source"]] += 1
+                fields.update(result["changes"])
+                if result["status"] == "failed":
+                    failures.append({"path": result["path"], "error": result["error"]})
+                if progress_callback:
+                    progress_callback(result, completed, len(entries))
+
+        report = {
+            "dry_run": dry_run,
+            "total": len(entries),
+            "statuses": dict(statuses),
+            "sources": dict(sources),
+            "fields": dict(fields),
+            "failures": failures,
+        }
+        verb = "seriam alterados" if dry_run else "alterados"
+        changed = statuses["would_update" if dry_run else "updated"]
+        console.print(Panel(
+            f"[bold green]Tags da biblioteca: {changed} de {len(entries)} arquivos {verb}"
+            f"{f', {len(failures)} com erro' if failures else ''}.[/bold green]"))
+        return report
@@ -3,20 +3,34 @@ from PyQt6.QtWidgets import (
     QMainWindow, QVBoxLayout, QWidget, QPushButton, QLabel,
     QMessageBox, QHBoxLayout, QComboBox, QProgressBar, QSizePolicy, QApplication
 )
-from PyQt6.QtCore import QUrl, QTimer, pyqtSlot, QThread, pyqtSignal, QObject
+from PyQt6.QtCore import QUrl, QTimer, QEvent, pyqtSlot, QThread, pyqtSignal, QObject
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtGui import QIcon, QFont
 from PyQt6.QtWebEngineCore import QWebEngineSettings, QWebEngineProfile
-from .custom_web_engine_page import CustomWebEnginePage
+from .custom_web_engine_page import CustomWebEnginePage, PageResourceSaver
 from .download_manager import DownloadManager
 import asyncio
-from .constants import CACHE_DIRECTORY
+from .constants import CACHE_DIRECTORY, PREFETCH_DELAY, BROWSER_RESOURCE_SAVER, BROWSER_CACHE_MAX_BYTES
 from urllib.parse import urlparse, parse_qs, urlunparse
 
 
+class ProgressBridge(QObject):
+    """Repassa os retratos do barramento de progresso para a thread da interface."""
+    snapshot = pyqtSignal(list)
+
+    def publish(self, snapshot):
+        # Chamado na thread do barramento; o sinal entrega o retrato na thread principal
+        self.snapshot.emit(snapshot)
+
+
+class ConnectivityNotifier(QObject):
+    """Entrega na thread da interface o resultado da verificação de conexão."""
+    result = pyqtSignal(bool)
+
+
 class DownloadWorker(QObject):
     """Worker para gerenciar o download em uma thread separada."""
-    progress = pyqtSignal(int)
+    job_started = pyqtSignal(str)  # job_id
     finished = pyqtSignal(str, bool)  # mensagem, é_erro
 
     def __init__(self, download_manager, youtube_url, format_type, quality):
@@ -29,22 +43,20 @@ class DownloadWorker(QObject):
     def run(self):
         """Lida com o processo de download."""
         try:
+            # O progresso chega pelo barramento de eventos, não por callback a cada bloco
             response, status_code = self.download_manager.handle_download_request(
-                self.youtube_url, self.format_type, self.quality, self.update_progress
+                self.youtube_url, self.format_type, self.quality, None
             )
             if status_code != 202:
                 message = response.get("error", "Falha no download!")
                 self.finished.emit(message, True)
             else:
+                self.job_started.emit(response["job_id"])
                 message = f"Download iniciado: {response['title']}"
                 self.finished.emit(message, False)
         except Exception as e:
             self.finished.emit(str(e), True)
 
-    def update_progress(self, percentage):
-        """Atualiza o sinal de progresso."""
-        self.progress.emit(percentage)
-
 
 class DownloadManagerHandler:
     """Manipula solicitações de download e confirmações do usuário."""
@@ -95,19 +107,23 @@ class DownloadManagerHandler:
 class BrowserWindow(QMainWindow):
     """Janela Principal do Navegador com recursos de download de vídeos do YouTube."""
 
-    def __init__(self):
+    def __init__(self, download_manager=None):
         super().__init__()
         self.setWindowTitle("YouTube")
-        self.download_manager = DownloadManager()
+        self.download_manager = download_manager or DownloadManager()
         self.download_handler = DownloadManagerHandler(
             self.download_manager, self)
         self.download_thread = None
         self.download_worker = None
+        # Jobs iniciados por esta janela, acompanhados pela barra de progresso
+        self.window_job_ids = set()
+        self.job_progress = {}
 
         self.home_url = "https://www.youtube.com"
         self.init_ui()  # Inicializa a interface do usuário apenas uma vez
-        self.init_timer()  # Move a inicialização do timer aqui
+        self.init_url_tracking()
         self.apply_styles()
+        self.init_progress_events()
         self.showMaximized()
 
     def init_ui(self):
@@ -198,41 +214,90 @@ class BrowserWindow(QMainWindow):
         cache_path = CACHE_DIRECTORY
 
         profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
-        profile.setHttpCacheMaximumSize(
-            1024 * 1024 * 100)  # Tamanho do cache: 100 MB
+        profile.setHttpCacheMaximumSize(BROWSER_CACHE_MAX_BYTES)
         profile.setCachePath(cache_path)
 
-        # Ativa a aceleração de hardware, rolagem suave e outros recursos
+        # Sem o modo de economia, ativa a aceleração de hardware, rolagem suave e outros recursos;
+        # com ele, esses recursos ficam desligados e os vídeos só tocam após um clique
+        rich_features = not BROWSER_RESOURCE_SAVER
         browser_settings = self.browser_view.settings()
         browser_settings.setAttribute(
-            QWebEngineSettings.WebAttribute.WebGLEnabled, True)
+            QWebEngineSettings.WebAttribute.WebGLEnabled, rich_features)
         browser_settings.setAttribute(
-            QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, True)
+            QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, rich_features)
         browser_settings.setAttribute(
             QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
         browser_settings.setAttribute(
-            QWebEngineSettings.WebAttribute.PluginsEnabled, True)
+            QWebEngineSettings.WebAttribute.PluginsEnabled, rich_features)
+        browser_settings.setAttribute(
+            QWebEngineSettings.WebAttribute.PlaybackRequiresUserGesture, BROWSER_RESOURCE_SAVER)
         browser_settings.setAttribute(
             QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
 
+        self.resource_saver = PageResourceSaver(self.browser_view, parent=self) if BROWSER_RESOURCE_SAVER else None
         self.browser_view.setUrl(QUrl(self.home_url))
 
-    def init_timer(self):
-        """Inicializa o timer de verificação da URL."""
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_url_periodically)
-        self.timer.start(2000)
-
-    def check_url_periodically(self):
-        """Verifica a URL atual e atualiza os estados dos botões de download."""
-        current_url = self.browser_view.url().toString()
+    def init_progress_events(self):
+        """Assina o barramento de progresso do gerenciador de downloads."""
+        self.progress_bridge = ProgressBridge()
+        self.progress_bridge.snapshot.connect(self.update_jobs)
+        self.unsubscribe_progress = self.download_manager.progress_events.subscribe(self.progress_bridge.publish)
+
+    def init_url_tracking(self):
+        """Acompanha a URL pelos sinais da visualização, sem polling."""
+        self.prefetch_url = None
+        self.prefetch_future = None
+        # Espera o usuário parar na página antes de adiantar a extração
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(int(PREFETCH_DELAY * 1000))
+        self.prefetch_timer.timeout.connect(self.start_prefetch)
+
+        # O YouTube navega entre vídeos via history.pushState; urlChanged cobre esses casos também
+        self.browser_view.urlChanged.connect(self.on_url_changed)
+        self.browser_view.titleChanged.connect(self.on_title_changed)
+
+    @staticmethod
+    def is_video_page(url):
+        """Indica se a URL é a página de um vídeo do YouTube."""
+        return url.startswith("https://www.youtube.com/watch?v=") or url.startswith("https://youtu.be/")
+
+    @pyqtSlot(QUrl)
+    def on_url_changed(self, url):
+        """Atualiza a URL exibida e os botões, e adianta a extração do vídeo aberto."""
+        current_url = url.toString()
         self.update_url_label(current_url)
 
-        is_youtube_url = current_url.startswith(
-            "https://www.youtube.com/watch?v=") or current_url.startswith("https://youtu.be/")
+        is_youtube_url = self.is_video_page(current_url)
         self.enable_download_buttons(is_youtube_url)
         if not is_youtube_url:
             self.setWindowTitle("YouTube")
+        self.schedule_prefetch(current_url if is_youtube_url else None)
+
+    @pyqtSlot(str)
+    def on_title_changed(self, title):
+        """Usa o título da página do vídeo como título da janela."""
+        if self.is_video_page(self.browser_view.url().toString()):
+            self.setWindowTitle(title or "YouTube")
+
+    def schedule_prefetch(self, youtube_url):
+        """Agenda a extração antecipada, cancelando a da página anterior."""
+        self.cancel_prefetch()
+        self.prefetch_url = self.download_handler.clean_youtube_url(youtube_url) if youtube_url else None
+        if self.prefetch_url:
+            self.prefetch_timer.start()
+
+    def cancel_prefetch(self):
+        """Cancela a extração antecipada que ainda não começou."""
+        self.prefetch_timer.stop()
+        if self.prefetch_future is not None:
+            self.prefetch_future.cancel()
+            self.prefetch_future = None
+
+    def start_prefetch(self):
+        """Extrai em segundo plano os metadados e formatos do vídeo aberto."""
+        if self.prefetch_url:
+            self.prefetch_future = self.download_manager.prefetch_video_info(self.prefetch_url)
 
     def update_url_label(self, url):
         """Atualiza o rótulo de exibição da URL."""
@@ -255,7 +320,7 @@ class BrowserWindow(QMainWindow):
 
         self.download_thread.started.connect(self.download_worker.run)
         self.download_worker.finished.connect(self.on_download_finished)
-        self.download_worker.progress.connect(self.update_progress)
+        self.download_worker.job_started.connect(self.track_job)
 
         self.download_thread.start()
 
@@ -280,6 +345,8 @@ class BrowserWindow(QMainWindow):
 
     def closeEvent(self, event):
         """Lida com a limpeza quando a janela é fechada."""
+        self.unsubscribe_progress()
+        self.cancel_prefetch()
         self.terminate_download_thread()
         event.accept()
 
@@ -297,10 +364,34 @@ class BrowserWindow(QMainWindow):
         current_url = self.browser_view.url().toString()
         self.download_handler.request_download(current_url, "audio", "best")
 
-    @pyqtSlot(int)
-    def update_progress(self, percentage):
-        """Update the progress bar with the current download percentage."""
-        self.progress_bar.setValue(percentage)
+    @pyqtSlot(str)
+    def track_job(self, job_id):
+        """Passa a acompanhar na barra de progresso um job iniciado pela janela."""
+        self.window_job_ids.add(job_id)
+        self.job_progress[job_id] = 0
+        self.update_progress_bar()
+
+    @pyqtSlot(list)
+    def update_jobs(self, snapshot):
+        """Atualiza o progresso dos jobs da janela a partir de um retrato do barramento."""
+        for entry in snapshot:
+            job_id = entry["job_id"]
+            if job_id not in self.window_job_ids:
+                continue
+            self.job_progress[job_id] = entry.get("percentage") or 0
+            if entry["stage"] in ("done", "failed", "cancelled"):
+                self.window_job_ids.discard(job_id)
+        self.update_progress_bar()
+        if self.resource_saver:
+            self.resource_saver.set_downloads_active(self.download_manager.are_downloads_active())
+
+    def update_progress_bar(self):
+        """Mostra o progresso médio dos jobs iniciados pela janela."""
+        if self.job_progress:
+            self.progress_bar.setValue(int(sum(self.job_progress.values()) / len(self.job_progress)))
+        if not self.window_job_ids:
+            # Lote concluído: o próximo download recomeça a média do zero
+            self.job_progress = {}
 
     @pyqtSlot()
     def navigate_home(self):
@@ -402,16 +493,15 @@ class BrowserWindow(QMainWindow):
         for button in [self.back_button, self.forward_button, self.refresh_button, self.home_button]:
             button.setStyleSheet(nav_button_style)
 
-    def focusInEvent(self, event):
-        """Repaint browser view on focus in."""
-        self.browser_view.setVisible(False)
-        self.browser_view.setVisible(True)
-        super().focusInEvent(event)
-
-    def focusOutEvent(self, event):
-        """Hide browser view on focus out."""
-        self.browser_view.setVisible(False)
-        super().focusOutEvent(event)
+    def changeEvent(self, event):
+        """Suspende a página do navegador com a janela fora de foco ou minimizada."""
+        if event.type() in (QEvent.Type.ActivationChange, QEvent.Type.WindowStateChange):
+            active = self.isActiveWindow() and not self.isMinimized()
+            if self.resource_saver:
+                self.resource_saver.set_window_active(active)
+            else:
+                self.browser_view.setVisible(active)
+        super().changeEvent(event)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from .constants import (
+    CACHE_DIRECTORY, METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES, METADATA_CACHE_MAX_BYTES
+)
+
+
+class MetadataCache:
+    """Cache de metadados de vídeos em duas camadas: LRU em memória e arquivos JSON em disco."""
+
+    def __init__(self, directory: str = os.path.join(CACHE_DIRECTORY, "metadata"),
+                 ttl: float = METADATA_CACHE_TTL,
+                 max_entries: int = METADATA_CACHE_MAX_ENTRIES,
+                 max_bytes: int = METADATA_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()  # video_id -> (fetched_at, info)
+        self.disk_sizes: Optional[Dict[str, int]] = None  # Carregado na primeira operação em disco
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.json")
+
+    def _load_disk_index(self):
+        """Lê o tamanho dos arquivos existentes para controlar a ocupação do disco."""
+        if self.disk_sizes is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.disk_sizes = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    self.disk_sizes[entry.name[:-5]] = entry.stat().st_size
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    def get(self, video_id: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Retorna os metadados em cache do vídeo, ou None se ausentes ou expirados."""
+        with self.lock:
+            entry = self.memory.get(video_id)
+            if entry and (allow_stale or self._is_fresh(entry[0])):
+                self.memory.move_to_end(video_id)
+                self.stats["memory_hits"] += 1
+                return dict(entry[1])
+
+            entry = self._read_from_disk(video_id)
+            if entry and (allow_stale or self._is_fresh(entry[0])):
+                self._remember(video_id, entry)
+                self.stats["disk_hits"] += 1
+                return dict(entry[1])
+
+            if entry:
+                self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, video_id: str, info: Dict[str, Any]):
+        """Armazena os metadados do vídeo nas duas camadas do cache."""
+        entry = (time.time(), dict(info))
+        with self.lock:
+            self._remember(video_id, entry)
+            self._write_to_disk(video_id, entry)
+
+    def invalidate(self, video_id: str):
+        """Remove o vídeo do cache."""
+        with self.lock:
+            self.memory.pop(video_id, None)
+            self._load_disk_index()
+            if self.disk_sizes.pop(video_id, None) is not None:
+                try:
+                    os.remove(self._path(video_id))
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna os contadores de acertos/falhas e a ocupação atual do cache."""
+        with self.lock:
+            self._load_disk_index()
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_entries": len(self.disk_sizes),
+                "disk_bytes": sum(self.disk_sizes.values()),
+            }
+
+    def _remember(self, video_id: str, entry: tuple):
+        """Insere na camada em memória, descartando os itens menos usados."""
+        self.memory[video_id] = entry
+        self.memory.move_to_end(video_id)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _read_from_disk(self, video_id: str) -> Optional[tuple]:
+        self._load_disk_index()
+        if video_id not in self.disk_sizes:
+            return None
+        try:
+            with open(self._path(video_id), "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+            return data["fetched_at"], data["info"]
+        except (OSError, ValueError, KeyError):
+            # Arquivo corrompido ou removido externamente
+            self.disk_sizes.pop(video_id, None)
+            return None
+
+    def _write_to_disk(self, video_id: str, entry: tuple):
+        self._load_disk_index()
+        path = self._path(video_id)
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump({"fetched_at": entry[0], "info": entry[1]}, cache_file, ensure_ascii=False)
+            os.replace(temp_path, path)
+            self.disk_sizes[video_id] = os.path.getsize(path)
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove os arquivos mais antigos até respeitar o limite de tamanho em disco."""
+        total_bytes = sum(self.disk_sizes.values())
+        if total_bytes <= self.max_bytes:
+            return
+
+        by_age = []
+        for video_id in self.disk_sizes:
+            try:
+                by_age.append((os.path.getmtime(self._path(video_id)), video_id))
+            except OSError:
+                by_age.append((0, video_id))
+        by_age.sort()
+
+        for _, video_id in by_age:
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= self.disk_sizes.pop(video_id)
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self._path(video_id))
+            except OSError:
+                pass
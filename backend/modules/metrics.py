@@ -0,0 +1,201 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from rich.panel import Panel
+from .progress_events import TERMINAL_STATES
+from .rich_console import console
+
+# Limites (segundos) dos histogramas de duração: de extrações rápidas a downloads longos
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+METRIC_HELP = {
+    "ytvd_stage_seconds": "Duração de cada etapa do pipeline de download.",
+    "ytvd_queue_wait_seconds": "Tempo entre aceitar o job e um worker começar a baixá-lo.",
+    "ytvd_jobs_total": "Jobs finalizados, por formato e estado final.",
+    "ytvd_job_bytes_total": "Bytes transferidos pelos jobs finalizados.",
+    "ytvd_resolved_info_total": "Consultas à extração completa recente (hit) e extrações novas (miss).",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, str, Dict[str, Any], float]  # (nome, tipo, rótulos, valor)
+
+
+def label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels) -> str:
+    items = labels.items() if isinstance(labels, dict) else labels
+    rendered = ",".join(f'{name}="{escape_label(value)}"' for name, value in items)
+    return f"{{{rendered}}}" if rendered else ""
+
+
+class Histogram:
+    """Contagens acumuladas por faixa, no formato dos histogramas do Prometheus."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Última posição: acima do maior limite
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Contadores e histogramas em memória, exportados em texto no formato do Prometheus.
+
+    Registrar uma medida custa um lock e algumas operações aritméticas, então
+    a instrumentação pode ficar sempre ligada. Valores que já existem em
+    outros componentes (fila, caches, banda) não são copiados: coletores os
+    leem apenas quando o /metrics é consultado.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.collectors: List[Callable[[], List[Sample]]] = []
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def record_stage(self, stage: str, seconds: float, job=None):
+        """Registra a duração de uma etapa; com um job, soma-a às etapas dele (usadas no trace)."""
+        self.observe("ytvd_stage_seconds", seconds, stage=stage)
+        if job is not None:
+            job.timings[stage] = job.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str, job=None) -> Iterator[None]:
+        """Mede o bloco como uma etapa do pipeline."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started_at, job)
+
+    def add_collector(self, collector: Callable[[], List[Sample]]):
+        """Registra uma função que devolve amostras lidas no momento da exportação."""
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Gera o texto de exposição do Prometheus (versão 0.0.4)."""
+        lines: List[str] = []
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in series.items()}
+                for name, series in self.histograms.items()
+            }
+            collectors = list(self.collectors)
+
+        for name, series in sorted(counters.items()):
+            self._header(lines, name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{format_labels(key)} {value:g}")
+
+        for name, series in sorted(histograms.items()):
+            self._header(lines, name, "histogram")
+            for key, (counts, total, count, buckets) in series.items():
+                cumulative = 0
+                bounds = [f"{bound:g}" for bound in buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{format_labels(key + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{format_labels(key)} {count}")
+
+        declared = set()
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                console.print(Panel(f"[bold red]Erro ao coletar métricas: {e}[/bold red]"))
+                continue
+            for name, metric_type, labels, value in samples:
+                if name not in declared:
+                    declared.add(name)
+                    self._header(lines, name, metric_type)
+                lines.append(f"{name}{format_labels(labels)} {float(value or 0):g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines: List[str], name: str, metric_type: str):
+        if name in METRIC_HELP:
+            lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+class JobTraceRecorder:
+    """Assinante do barramento de progresso que contabiliza os jobs finalizados.
+
+    Com trace_path, grava também uma linha JSON por job com as durações de
+    cada etapa, a espera na fila e os bytes transferidos.
+    """
+
+    def __init__(self, registry: MetricsRegistry, trace_path: Optional[str] = None):
+        self.registry = registry
+        self.trace_path = trace_path
+        self.lock = threading.Lock()
+        if trace_path:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+
+    def record_snapshot(self, snapshot: List[Dict[str, Any]]):
+        finished = [entry for entry in snapshot if entry["stage"] in TERMINAL_STATES]
+        for entry in finished:
+            self.registry.inc("ytvd_jobs_total", format=entry["format"], state=entry["stage"])
+            if entry.get("downloaded_bytes"):
+                self.registry.inc("ytvd_job_bytes_total", entry["downloaded_bytes"], format=entry["format"])
+        if finished and self.trace_path:
+            self.write_traces(finished)
+
+    def write_traces(self, entries: List[Dict[str, Any]]):
+        now = time.time()
+        lines = [
+            json.dumps({
+                "time": round(now, 3),
+                "job_id": entry["job_id"],
+                "video_id": entry.get("video_id"),
+                "title": entry.get("title"),
+                "format": entry["format"],
+                "quality": entry.get("quality"),
+                "source": entry.get("source"),
+                "state": entry["stage"],
+                "bytes": entry.get("downloaded_bytes"),
+                "timings": {stage: round(seconds, 4) for stage, seconds in (entry.get("timings") or {}).items()},
+            }, ensure_ascii=False)
+            for entry in entries
+        ]
+        try:
+            with self.lock, open(self.trace_path, "a", encoding="utf-8") as trace_file:
+                trace_file.write("\n".join(lines) + "\n")
+        except OSError as e:
+            console.print(Panel(f"[bold red]Erro ao gravar o trace dos jobs: {e}[/bold red]"))
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Callable, List, Optional
+from rich.panel import Panel
+from .constants import FFMPEG_PATH, POSTPROCESS_WORKERS, AUDIO_BITRATE
+from .metrics import metrics
+from .rich_console import console
+
+
+def merge_formats(part_paths: List[str], output_path: str):
+    """Junta as faixas de vídeo e áudio baixadas separadamente, sem recodificar."""
+    command = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y"]
+    for path in part_paths:
+        command += ["-i", path]
+    for index in range(len(part_paths)):
+        command += ["-map", f"{index}"]
+    temp_path = f"{os.path.splitext(output_path)[0]}.temp{os.path.splitext(output_path)[1]}"
+    command += ["-c", "copy", temp_path]
+
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou ao juntar os formatos: {result.stderr.decode(errors='replace').strip()}")
+    os.replace(temp_path, output_path)
+    for path in part_paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PostProcessingCancelled(Exception):
+    """O job foi cancelado durante o pós-processamento."""
+
+
+class PostProcessingPool:
+    """Estágio de pós-processamento (transcodificação para MP3 + tags) separado dos slots de rede.
+
+    Cada worker controla um processo ffmpeg próprio, de modo que o número de
+    codificações simultâneas acompanha os núcleos da CPU, independentemente de
+    quantos downloads estão ativos. Manter o processo acessível permite
+    encerrá-lo imediatamente quando o job é cancelado.
+    """
+
+    def __init__(self, workers: int = POSTPROCESS_WORKERS):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytvd-postprocess")
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.futures: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def backlog(self) -> int:
+        """Quantidade de jobs aguardando ou em pós-processamento."""
+        with self.lock:
+            return len(self.futures)
+
+    def submit(self, job, source_path: str, output_path: str, video_info: Dict[str, Any],
+               tag_function: Callable[[str, Dict[str, Any]], None],
+               on_done: Callable[[Optional[BaseException]], None], keep_source: bool = False) -> Future:
+        """Agenda a transcodificação e a marcação do arquivo baixado.
+
+        keep_source preserva o arquivo de origem (ex.: áudio extraído de um vídeo da biblioteca).
+        """
+        future = self.executor.submit(self._run, job, source_path, output_path, video_info, tag_function, keep_source,
+                                      time.monotonic())
+
+        def done(completed: Future):
+            with self.lock:
+                self.futures.pop(job.job_id, None)
+            error = PostProcessingCancelled() if completed.cancelled() else completed.exception()
+            on_done(error)
+
+        with self.lock:
+            self.futures[job.job_id] = future
+        future.add_done_callback(done)
+        return future
+
+    def cancel(self, job_id: str):
+        """Cancela o job pendente ou encerra o ffmpeg em execução."""
+        with self.lock:
+            future = self.futures.get(job_id)
+            process = self.processes.get(job_id)
+        if future is not None:
+            future.cancel()
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def _run(self, job, source_path: str, output_path: str, video_info: Dict[str, Any], tag_function,
+             keep_source: bool = False, submitted_at: Optional[float] = None):
+        if submitted_at is not None:
+            metrics.record_stage("postprocess_wait", time.monotonic() - submitted_at, job)
+        if job.cancelled:
+            raise PostProcessingCancelled()
+        if source_path != output_path:
+            with metrics.stage("transcode", job):
+                self.transcode_to_mp3(job, source_path, output_path, keep_source)
+        if job.cancelled:
+            raise PostProcessingCancelled()
+        with metrics.stage("metadata", job):
+            tag_function(output_path, video_info)
+
+    def transcode_to_mp3(self, job, source_path: str, output_path: str, keep_source: bool = False):
+        """Converte o arquivo de origem para MP3 e remove o original (a menos que keep_source)."""
+        temp_path = f"{os.path.splitext(output_path)[0]}.temp.mp3"
+        command = [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+            "-i", source_path, "-vn", "-codec:a", "libmp3lame", "-b:a", f"{AUDIO_BITRATE}k", temp_path,
+        ]
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        with self.lock:
+            self.processes[job.job_id] = process
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self.lock:
+                self.processes.pop(job.job_id, None)
+
+        if job.cancelled:
+            raise PostProcessingCancelled()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg falhou ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+
+        os.replace(temp_path, output_path)
+        if keep_source:
+            return
+        try:
+            os.remove(source_path)
+        except OSError as e:
+            console.print(Panel(f"[bold yellow]Não foi possível remover {source_path}: {e}[/bold yellow]"))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
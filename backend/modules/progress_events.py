@@ -0,0 +1,122 @@
+import threading
+from typing import Dict, Any, Callable, List
+from rich.panel import Panel
+from .constants import PROGRESS_PUBLISH_INTERVAL, TERMINAL_STATES
+from .rich_console import console
+
+
+class ProgressEventBus:
+    """Barramento central de progresso, com atualizações agrupadas por job.
+
+    Os hooks de download apenas sobrescrevem o último estado de cada job
+    (update é barato e não notifica ninguém). Uma thread publica, no máximo
+    uma vez por intervalo, um retrato de todos os jobs (bytes, velocidade,
+    ETA, etapa) para os assinantes — janela Qt, stream SSE da API etc. — e
+    só quando algo mudou. Jobs finalizados aparecem em um último retrato e
+    depois saem do barramento.
+    """
+
+    def __init__(self, interval: float = PROGRESS_PUBLISH_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, Any] = {}
+        self.transfers: Dict[str, Dict[str, Any]] = {}
+        self.subscribers: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.last_snapshot: List[Dict[str, Any]] = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ytvd-progress-events", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    # ------------------------------------------------------------ produtores
+
+    def track(self, job):
+        """Passa a publicar o estado do job."""
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.transfers.setdefault(job.job_id, {})
+
+    def update(self, job_id: str, **fields):
+        """Registra o último progresso de transferência do job (bytes, velocidade, ETA...)."""
+        with self.lock:
+            if job_id in self.transfers:
+                self.transfers[job_id].update(fields)
+
+    # ----------------------------------------------------------- assinantes
+
+    def subscribe(self, callback: Callable[[List[Dict[str, Any]]], None]) -> Callable[[], None]:
+        """Registra um assinante e retorna a função que cancela a assinatura.
+
+        O callback é chamado na thread do barramento; assinantes de interface
+        devem repassar o retrato para a própria thread (ex.: sinal Qt).
+        """
+        with self.lock:
+            self.subscribers.append(callback)
+
+        def unsubscribe():
+            with self.lock:
+                if callback in self.subscribers:
+                    self.subscribers.remove(callback)
+
+        return unsubscribe
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Retorna o último retrato publicado."""
+        with self.lock:
+            return list(self.last_snapshot)
+
+    # ----------------------------------------------------------- publicação
+
+    def _build_snapshot(self) -> List[Dict[str, Any]]:
+        snapshot = []
+        for job_id, job in self.jobs.items():
+            transfer = self.transfers.get(job_id, {})
+            entry = {**job.to_dict(), "stage": job.state, **transfer}
+            if job.state == "done":
+                entry["percentage"] = 100
+            snapshot.append(entry)
+        return snapshot
+
+    def publish(self) -> bool:
+        """Monta o retrato atual e o entrega aos assinantes se houve mudança."""
+        with self.lock:
+            snapshot = self._build_snapshot()
+            # Jobs finalizados são publicados uma última vez e depois descartados
+            for entry in snapshot:
+                if entry["stage"] in TERMINAL_STATES:
+                    self.jobs.pop(entry["job_id"], None)
+                    self.transfers.pop(entry["job_id"], None)
+            if snapshot == self.last_snapshot:
+                return False
+            self.last_snapshot = snapshot
+            subscribers = list(self.subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                console.print(Panel(f"[bold red]Erro ao publicar o progresso: {e}[/bold red]"))
+        return True
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.publish()
+
+
+def transfer_fields(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrai de um evento de progresso (formato do yt-dlp) os campos publicados no barramento."""
+    downloaded = d.get("downloaded_bytes") or 0
+    total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+    fields: Dict[str, Any] = {
+        "downloaded_bytes": downloaded,
+        "total_bytes": total or None,
+        "speed": d.get("speed"),
+        "eta": d.get("eta"),
+    }
+    if total:
+        fields["percentage"] = min(int(downloaded / total * 100), 100)
+    return fields
@@ -1,11 +1,27 @@
 # rich_console.py
 
-from rich.console import Console
-from rich.progress import Progress
+import threading
+from typing import Dict, Any, List, Optional
+from rich.console import Console, Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, DownloadColumn, TaskID
+from .constants import DASHBOARD_REFRESH_RATE, TERMINAL_STATES
+
+# Console único do processo: com um só Console, o Live do painel mantém as mensagens acima dele
+console = Console()
+
+STAGE_LABELS = {
+    "queued": "na fila",
+    "waiting": "aguardando vídeo",
+    "running": "iniciando",
+    "downloading": "baixando",
+    "postprocessing": "convertendo",
+}
 
 class RichConsole:
     def __init__(self):
-        self.console = Console()
+        self.console = console
 
     def print_info(self, message):
         """Imprime uma mensagem de informação em azul."""
@@ -36,3 +52,100 @@ class RichConsole:
     def stop_progress(self):
         """Para a barra de progresso."""
         self.progress.stop()
+
+
+def format_speed(speed: Optional[float]) -> str:
+    if not speed:
+        return "-"
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if speed < 1024:
+            return f"{speed:.1f} {unit}"
+        speed /= 1024
+    return f"{speed:.1f} GB/s"
+
+
+def format_eta(eta: Optional[float]) -> str:
+    if eta is None:
+        return "-"
+    minutes, seconds = divmod(int(eta), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class ConsoleDashboard:
+    """Painel único no terminal com todos os downloads ativos e na fila.
+
+    Assina o barramento de progresso, então recebe no máximo um retrato por
+    intervalo, e cada job é uma tarefa de uma mesma tabela Progress. Só o
+    Live deste painel desenha na tela, a uma taxa fixa, de modo que o custo
+    de renderização não cresce com o número de jobs. O painel aparece quando
+    há jobs e some quando a fila esvazia.
+    """
+
+    def __init__(self, console: Console = console, refresh_per_second: float = DASHBOARD_REFRESH_RATE):
+        self.console = console
+        self.refresh_per_second = refresh_per_second
+        self.progress = Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TextColumn("{task.fields[stage]}"),
+            DownloadColumn(),
+            TextColumn("{task.fields[speed]}"),
+            TextColumn("{task.fields[eta]}"),
+            console=self.console,
+        )
+        self.tasks: Dict[str, TaskID] = {}
+        self.throughput = 0.0
+        self.queued = 0
+        self.lock = threading.Lock()
+        self.live: Optional[Live] = None
+
+    def __rich__(self):
+        with self.lock:
+            summary = (
+                f"[bold]{len(self.tasks) - self.queued}[/bold] ativo(s), [bold]{self.queued}[/bold] na fila — "
+                f"vazão total: [bold cyan]{format_speed(self.throughput)}[/bold cyan]"
+            )
+            return Panel(Group(self.progress, summary), title="Downloads")
+
+    def update(self, snapshot: List[Dict[str, Any]]):
+        """Aplica um retrato do barramento de progresso (chamado na thread do barramento)."""
+        with self.lock:
+            seen = set()
+            for entry in snapshot:
+                job_id = entry["job_id"]
+                if entry["stage"] in TERMINAL_STATES:
+                    continue
+                seen.add(job_id)
+                fields = {
+                    "stage": STAGE_LABELS.get(entry["stage"], entry["stage"]),
+                    "speed": format_speed(entry.get("speed")) if entry["stage"] == "downloading" else "",
+                    "eta": format_eta(entry.get("eta")) if entry["stage"] == "downloading" else "",
+                }
+                task_id = self.tasks.get(job_id)
+                if task_id is None:
+                    task_id = self.tasks[job_id] = self.progress.add_task(
+                        f"[cyan]{entry['title']}", total=None, **fields)
+                self.progress.update(task_id, completed=entry.get("downloaded_bytes") or 0,
+                                     total=entry.get("total_bytes"), **fields)
+
+            for job_id in list(self.tasks):
+                if job_id not in seen:
+                    self.progress.remove_task(self.tasks.pop(job_id))
+
+            self.throughput = sum(entry.get("speed") or 0 for entry in snapshot if entry["stage"] == "downloading")
+            self.queued = sum(1 for entry in snapshot if entry["stage"] in ("queued", "waiting"))
+            has_jobs = bool(self.tasks)
+
+        if has_jobs and self.live is None:
+            self.live = Live(self, console=self.console, refresh_per_second=self.refresh_per_second, transient=True)
+            self.live.start()
+        elif not has_jobs and self.live is not None:
+            self.live.stop()
+            self.live = None
+
+    def stop(self):
+        if self.live is not None:
+            self.live.stop()
+            self.live = None
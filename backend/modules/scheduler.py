@@ -0,0 +1,248 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Callable
+from rich.panel import Panel
+from .constants import MAX_CONCURRENT_DOWNLOADS, MAX_QUEUED_DOWNLOADS, MAX_QUEUED_PER_SOURCE, CONCURRENCY_MAX
+from .metrics import metrics
+from .rich_console import console
+
+
+class QueueFullError(Exception):
+    """A fila de downloads atingiu o limite de admissão."""
+
+
+def default_priority(is_audio: bool, quality: str, boost: int = 0) -> int:
+    """Calcula a prioridade de um job (menor valor = atendido antes)."""
+    if is_audio:
+        priority = 0
+    elif not str(quality).isdigit():
+        priority = 2
+    else:
+        height = int(quality)
+        priority = 1 if height <= 720 else 2 if height <= 1080 else 3
+    return priority - boost
+
+
+class DownloadJob:
+    """Representa um download aceito pelo gerenciador, da fila até a conclusão."""
+
+    def __init__(self, youtube_url: str, video_id: str, title: str, is_audio: bool, quality: str,
+                 progress_callback: Optional[Callable[[int], None]] = None,
+                 priority: Optional[int] = None, source: str = "window"):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.youtube_url = youtube_url
+        self.video_id = video_id
+        self.title = title
+        self.is_audio = is_audio
+        self.quality = quality
+        self.progress_callbacks: List[Callable[[int], None]] = [progress_callback] if progress_callback else []
+        self.priority = default_priority(is_audio, quality) if priority is None else priority
+        self.source = source
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.queued_at = time.monotonic()
+        # Segundos gastos em cada etapa (extração, fila, transferência, pós-processamento...)
+        self.timings: Dict[str, float] = {}
+        self.output_path: Optional[str] = None
+        # Nome do arquivo de saída (sem extensão), definido ao registrar o job
+        self.file_stem: Optional[str] = None
+        # Jobs de áudio que aguardam este vídeo para extrair o áudio localmente
+        self.followers: List["DownloadJob"] = []
+        self.cancel_event = threading.Event()
+        self.cancel_requested_at: Optional[float] = None
+
+    def add_progress_callback(self, progress_callback: Optional[Callable[[int], None]]):
+        """Anexa outro solicitante ao mesmo job (pedidos idênticos simultâneos)."""
+        if progress_callback:
+            self.progress_callbacks.append(progress_callback)
+
+    def progress_callback(self, percentage: int):
+        """Repassa o progresso a todos os solicitantes do job."""
+        for progress_callback in list(self.progress_callbacks):
+            progress_callback(percentage)
+
+    @property
+    def active(self) -> bool:
+        return self.state not in ("done", "failed", "cancelled")
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Sinaliza ao worker que o job deve ser interrompido."""
+        if not self.cancel_event.is_set():
+            self.cancel_requested_at = time.monotonic()
+            self.cancel_event.set()
+
+    @property
+    def format_type(self) -> str:
+        return "audio" if self.is_audio else "video"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "url": self.youtube_url,
+            "video_id": self.video_id,
+            "title": self.title,
+            "format": self.format_type,
+            "quality": self.quality,
+            "priority": self.priority,
+            "source": self.source,
+            "state": self.state,
+            "requesters": len(self.progress_callbacks),
+            "timings": dict(self.timings),
+        }
+
+
+class DownloadScheduler:
+    """Pool fixo de workers com fila de prioridade, justiça entre origens e limite de admissão.
+
+    O pool tem threads suficientes para o limite máximo, mas só `limit`
+    jobs rodam ao mesmo tempo; o limite pode ser alterado em tempo real.
+    Cada origem (extensão, janela, CLI...) tem sua própria fila ordenada por
+    prioridade. Entre origens com a mesma prioridade no topo, a que foi
+    atendida há mais tempo é escolhida, para que um lote grande de uma origem
+    não bloqueie as demais.
+    """
+
+    def __init__(self, run_job: Callable[[DownloadJob], None],
+                 workers: int = CONCURRENCY_MAX,
+                 limit: int = MAX_CONCURRENT_DOWNLOADS,
+                 max_queued: int = MAX_QUEUED_DOWNLOADS,
+                 max_queued_per_source: int = MAX_QUEUED_PER_SOURCE):
+        self.run_job = run_job
+        self.limit = min(limit, workers)
+        self.max_queued = max_queued
+        self.max_queued_per_source = max_queued_per_source
+        self.queues: Dict[str, list] = {}  # origem -> heap de (prioridade, seq, job)
+        self.last_served: Dict[str, int] = {}
+        self.running: Dict[str, DownloadJob] = {}
+        self.sequence = itertools.count()
+        self.serve_tick = itertools.count(1)
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.workers = [
+            threading.Thread(target=self._worker_loop, name=f"ytvd-download-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def queued_count(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, job: DownloadJob) -> int:
+        """Enfileira o job e retorna sua posição na fila (0 se um worker já está livre)."""
+        with self.condition:
+            if self.queued_count >= self.max_queued:
+                raise QueueFullError(f"A fila de downloads está cheia ({self.max_queued} itens).")
+            source_queue = self.queues.setdefault(job.source, [])
+            if len(source_queue) >= self.max_queued_per_source:
+                raise QueueFullError(f"Limite de {self.max_queued_per_source} downloads na fila para '{job.source}'.")
+
+            job.state = "queued"
+            job.queued_at = time.monotonic()
+            heapq.heappush(source_queue, (job.priority, next(self.sequence), job))
+            self.condition.notify()
+
+            if len(self.running) + self.queued_count <= self.limit:
+                return 0
+            return self._positions().get(job.job_id, 0)
+
+    def remove(self, job_id: str) -> Optional[DownloadJob]:
+        """Remove da fila um job que ainda não começou."""
+        with self.condition:
+            for source, queue in self.queues.items():
+                for index, (_, _, job) in enumerate(queue):
+                    if job.job_id == job_id:
+                        queue.pop(index)
+                        heapq.heapify(queue)
+                        return job
+        return None
+
+    def positions(self) -> Dict[str, int]:
+        """Retorna a posição atual (1 = próximo) de cada job na fila."""
+        with self.condition:
+            return self._positions()
+
+    def queued_jobs(self) -> List[DownloadJob]:
+        """Lista os jobs da fila na ordem em que serão atendidos."""
+        with self.condition:
+            return self._ordered_jobs()
+
+    def running_jobs(self) -> List[DownloadJob]:
+        with self.condition:
+            return list(self.running.values())
+
+    def set_limit(self, limit: int):
+        """Altera quantos jobs podem rodar ao mesmo tempo (até o tamanho do pool)."""
+        with self.condition:
+            self.limit = max(1, min(limit, len(self.workers)))
+            self.condition.notify_all()
+
+    def shutdown(self):
+        """Interrompe os workers depois que terminarem o job atual."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def _pick_source(self, queues: Dict[str, list], last_served: Dict[str, int]) -> Optional[str]:
+        candidates = [source for source, queue in queues.items() if queue]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda source: (queues[source][0][0], last_served.get(source, 0)))
+
+    def _ordered_jobs(self) -> List[DownloadJob]:
+        """Simula a ordem de atendimento sobre uma cópia das filas."""
+        queues = {source: list(queue) for source, queue in self.queues.items()}
+        last_served = dict(self.last_served)
+        tick = max(last_served.values(), default=0)
+        ordered = []
+        while True:
+            source = self._pick_source(queues, last_served)
+            if source is None:
+                return ordered
+            ordered.append(heapq.heappop(queues[source])[2])
+            tick += 1
+            last_served[source] = tick
+
+    def _positions(self) -> Dict[str, int]:
+        return {job.job_id: position for position, job in enumerate(self._ordered_jobs(), start=1)}
+
+    def _next_job(self) -> Optional[DownloadJob]:
+        with self.condition:
+            while True:
+                if self.stopped:
+                    return None
+                source = self._pick_source(self.queues, self.last_served)
+                if source is not None and len(self.running) < self.limit:
+                    job = heapq.heappop(self.queues[source])[2]
+                    self.last_served[source] = next(self.serve_tick)
+                    job.state = "running"
+                    job.started_at = time.time()
+                    queue_wait = time.monotonic() - job.queued_at
+                    job.timings["queue_wait"] = job.timings.get("queue_wait", 0.0) + queue_wait
+                    metrics.observe("ytvd_queue_wait_seconds", queue_wait, source=job.source)
+                    self.running[job.job_id] = job
+                    return job
+                self.condition.wait()
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self.run_job(job)
+            except Exception as e:
+                console.print(Panel(f"[bold red]Erro inesperado no worker de download: {e}[/bold red]"))
+            finally:
+                with self.condition:
+                    self.running.pop(job.job_id, None)
+                    self.condition.notify()
@@ -0,0 +1,268 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from .constants import (
+    CONNECTIONS_PER_JOB, MAX_TOTAL_CONNECTIONS, SEGMENT_MIN_SIZE, DOWNLOAD_SOCKET_TIMEOUT, STREAM_CHUNK_SIZE,
+    RESUME_CHECKPOINT_INTERVAL
+)
+from .http_session import LazySession
+
+SEGMENTABLE_PROTOCOLS = ("http", "https")
+PROGRESS_INTERVAL = 0.1  # segundos entre chamadas do progress_hook
+RESUME_SUFFIX = ".resume"  # Faixas pendentes de um .part, gravadas ao lado dele
+
+
+def can_segment(format_info: Dict[str, Any]) -> bool:
+    """Indica se o formato é um arquivo único por HTTP, apto a download em faixas (Range)."""
+    return bool(format_info.get("url")) and format_info.get("protocol", "https") in SEGMENTABLE_PROTOCOLS
+
+
+class ConnectionBudget:
+    """Limite global de conexões HTTP simultâneas, compartilhado por todos os jobs."""
+
+    def __init__(self, total: int = MAX_TOTAL_CONNECTIONS):
+        self.total = total
+        self.semaphore = threading.BoundedSemaphore(total)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        return self.semaphore.acquire(timeout=timeout)
+
+    def release(self):
+        self.semaphore.release()
+
+
+class SegmentedDownloader:
+    """Baixa um único arquivo em várias faixas paralelas, gravando cada uma direto na sua posição.
+
+    As faixas são escritas no offset correto de um arquivo .part pré-alocado,
+    então o resultado já sai montado em ordem, sem reler os dados. O progresso
+    é reportado no mesmo formato dos hooks do yt-dlp; uma exceção levantada
+    pelo hook (ex.: cancelamento) interrompe todas as conexões do job.
+
+    De tempos em tempos, as faixas que ainda faltam são gravadas em um
+    arquivo .part.resume (depois de um fsync do .part). Se o download for
+    interrompido, mesmo por uma falha do processo, a próxima tentativa com
+    o mesmo destino e tamanho baixa só essas faixas.
+    """
+
+    def __init__(self, budget: Optional[ConnectionBudget] = None,
+                 connections_per_job: int = CONNECTIONS_PER_JOB,
+                 min_segment_size: int = SEGMENT_MIN_SIZE):
+        self.budget = budget or ConnectionBudget()
+        self.connections_per_job = connections_per_job
+        self.min_segment_size = min_segment_size
+        self.http = LazySession(pool_connections=8, pool_maxsize=self.budget.total)
+
+    @property
+    def session(self):
+        """Sessão HTTP compartilhada por todas as faixas."""
+        return self.http.get()
+
+    def probe(self, url: str, headers: Dict[str, str]) -> Tuple[int, bool]:
+        """Descobre o tamanho do arquivo e se o servidor aceita requisições por faixa."""
+        with self.session.get(url, headers={**headers, "Range": "bytes=0-0"}, stream=True,
+                              timeout=DOWNLOAD_SOCKET_TIMEOUT) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                return (int(total) if total.isdigit() else 0), True
+            return int(response.headers.get("Content-Length") or 0), False
+
+    def plan_segments(self, total_bytes: int, connections: int,
+                      remaining: Optional[List[Tuple[int, int]]] = None) -> List[Tuple[int, int]]:
+        """Divide o arquivo (ou só as faixas que faltam) em faixas (início, fim inclusivo), com mais faixas que conexões."""
+        ranges = [(0, total_bytes - 1)] if remaining is None else remaining
+        pending_bytes = sum(end - start + 1 for start, end in ranges)
+        if connections <= 1 or pending_bytes < 2 * self.min_segment_size:
+            return list(ranges)
+        segment_count = min(connections * 2, max(1, pending_bytes // self.min_segment_size))
+        segment_size = -(-pending_bytes // segment_count)
+        return [
+            (segment_start, min(segment_start + segment_size, end + 1) - 1)
+            for start, end in ranges for segment_start in range(start, end + 1, segment_size)
+        ]
+
+    @staticmethod
+    def load_checkpoint(part_path: str, total_bytes: int) -> Optional[List[Tuple[int, int]]]:
+        """Lê as faixas pendentes de um download interrompido, se o .part corresponder ao mesmo arquivo."""
+        try:
+            with open(part_path + RESUME_SUFFIX, encoding="utf-8") as resume_file:
+                checkpoint = json.load(resume_file)
+            if checkpoint.get("total_bytes") != total_bytes or os.path.getsize(part_path) != total_bytes:
+                return None
+            return [(int(start), int(end)) for start, end in checkpoint["remaining"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def save_checkpoint(part_path: str, total_bytes: int, remaining: List[Tuple[int, int]]):
+        """Grava as faixas pendentes depois de garantir no disco os bytes já escritos."""
+        descriptor = os.open(part_path, os.O_RDWR)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+        temporary_path = part_path + RESUME_SUFFIX + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as resume_file:
+            json.dump({"total_bytes": total_bytes, "remaining": remaining}, resume_file)
+        os.replace(temporary_path, part_path + RESUME_SUFFIX)
+
+    def download(self, url: str, output_path: str, headers: Optional[Dict[str, str]] = None,
+                 progress_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 connections: Optional[int] = None,
+                 throttle: Optional[Callable[[int], None]] = None) -> str:
+        """Baixa a URL para output_path e retorna o caminho final.
+
+        throttle, se informado, é chamado com o tamanho de cada bloco antes de
+        gravá-lo e pode bloquear para respeitar um limite de banda.
+        """
+        headers = headers or {}
+        progress_hook = progress_hook or (lambda d: None)
+        throttle = throttle or (lambda nbytes: None)
+        connections = min(connections or self.connections_per_job, self.budget.total)
+        total_bytes, accepts_ranges = self.probe(url, headers)
+        if not accepts_ranges or not total_bytes:
+            connections = 1
+
+        part_path = f"{output_path}.part"
+        resume_path = part_path + RESUME_SUFFIX
+        if total_bytes and not os.path.exists(part_path) and os.path.isfile(output_path) \
+                and os.path.getsize(output_path) == total_bytes:
+            # Transferido antes de uma interrupção (ex.: durante a junção dos formatos)
+            progress_hook({"status": "finished", "downloaded_bytes": total_bytes,
+                           "total_bytes": total_bytes, "filename": output_path})
+            return output_path
+
+        remaining = self.load_checkpoint(part_path, total_bytes) if accepts_ranges and total_bytes else None
+        if remaining is None:
+            if os.path.exists(resume_path):
+                os.remove(resume_path)  # Checkpoint de outro arquivo ou de um .part descartado
+            segments = self.plan_segments(total_bytes, connections) if total_bytes else [(0, None)]
+            with open(part_path, "wb") as part_file:
+                if total_bytes:
+                    part_file.truncate(total_bytes)
+        else:
+            segments = self.plan_segments(total_bytes, connections, remaining)
+        resumable = accepts_ranges and bool(total_bytes)
+
+        already_downloaded = total_bytes - sum(end - start + 1 for start, end in segments) if resumable else 0
+        state = {"downloaded": already_downloaded, "error": None}
+        # Próximo byte a gravar de cada faixa ainda não concluída (chave: início da faixa)
+        positions = {start: start for start, end in segments}
+        lock = threading.Lock()
+        stop_event = threading.Event()
+        pending = queue.Queue()
+        for segment in segments:
+            pending.put(segment)
+
+        def remaining_segments() -> List[Tuple[int, int]]:
+            with lock:
+                return [(positions[start], end) for start, end in segments
+                        if start in positions and positions[start] <= end]
+
+        def fetch_segment(start: int, end: Optional[int]):
+            range_headers = dict(headers)
+            if end is not None and (start > 0 or end < total_bytes - 1):
+                range_headers["Range"] = f"bytes={start}-{end}"
+            with self.session.get(url, headers=range_headers, stream=True, timeout=DOWNLOAD_SOCKET_TIMEOUT) as response:
+                response.raise_for_status()
+                if "Range" in range_headers and response.status_code != 206:
+                    raise IOError("O servidor ignorou a requisição por faixa.")
+                with open(part_path, "r+b") as part_file:
+                    part_file.seek(start)
+                    position = start
+                    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                        if stop_event.is_set():
+                            return
+                        throttle(len(chunk))
+                        part_file.write(chunk)
+                        # O checkpoint só conta bytes já entregues ao sistema operacional
+                        part_file.flush()
+                        position += len(chunk)
+                        with lock:
+                            state["downloaded"] += len(chunk)
+                            positions[start] = position
+                expected = end + 1 if end is not None else None
+                if expected is None and "Content-Encoding" not in response.headers:
+                    content_length = response.headers.get("Content-Length")
+                    expected = start + int(content_length) if content_length and content_length.isdigit() else None
+                if expected is not None and position != expected:
+                    # Conexão encerrada antes do fim: a faixa continua pendente no checkpoint
+                    raise IOError(f"Faixa incompleta: {position - start} de {expected - start} bytes recebidos.")
+            with lock:
+                positions.pop(start, None)
+
+        def worker():
+            while not stop_event.is_set():
+                try:
+                    segment_start, segment_end = pending.get_nowait()
+                except queue.Empty:
+                    return
+                # Espera por uma conexão do orçamento global sem ignorar o cancelamento
+                while not self.budget.acquire(timeout=PROGRESS_INTERVAL):
+                    if stop_event.is_set():
+                        return
+                try:
+                    fetch_segment(segment_start, segment_end)
+                except Exception as e:
+                    with lock:
+                        state["error"] = state["error"] or e
+                    stop_event.set()
+                finally:
+                    self.budget.release()
+
+        threads = [
+            threading.Thread(target=worker, name="ytvd-segment", daemon=True)
+            for _ in range(min(connections, len(segments)))
+        ]
+        for thread in threads:
+            thread.start()
+
+        started_at = time.monotonic()
+        last_checkpoint = started_at
+        completed = False
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(PROGRESS_INTERVAL / len(threads))
+                self._report(progress_hook, state["downloaded"], total_bytes, started_at, output_path,
+                             already_downloaded)
+                if resumable and time.monotonic() - last_checkpoint >= RESUME_CHECKPOINT_INTERVAL:
+                    self.save_checkpoint(part_path, total_bytes, remaining_segments())
+                    last_checkpoint = time.monotonic()
+            if state["error"] is not None:
+                raise state["error"]
+
+            os.replace(part_path, output_path)
+            if os.path.exists(resume_path):
+                os.remove(resume_path)
+            progress_hook({"status": "finished", "downloaded_bytes": state["downloaded"],
+                           "total_bytes": state["downloaded"], "filename": output_path})
+            completed = True
+            return output_path
+        finally:
+            if not completed:
+                stop_event.set()
+                for thread in threads:
+                    thread.join()
+                if resumable and os.path.exists(part_path):
+                    # Guarda o ponto exato da interrupção para a próxima tentativa
+                    self.save_checkpoint(part_path, total_bytes, remaining_segments())
+
+    @staticmethod
+    def _report(progress_hook, downloaded: int, total_bytes: int, started_at: float, output_path: str,
+                resumed_bytes: int = 0):
+        elapsed = time.monotonic() - started_at
+        speed = (downloaded - resumed_bytes) / elapsed if elapsed > 0 else None
+        progress_hook({
+            "status": "downloading",
+            "downloaded_bytes": downloaded,
+            "total_bytes": total_bytes or None,
+            "speed": speed,
+            "eta": (total_bytes - downloaded) / speed if speed and total_bytes else None,
+            "filename": output_path,
+        })
@@ -0,0 +1,40 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Garante uma única execução simultânea por chave; chamadas concorrentes recebem o mesmo resultado."""
+
+    def __init__(self):
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    self.calls.pop(key, None)
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
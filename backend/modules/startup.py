@@ -0,0 +1,80 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List, Tuple
+from rich.panel import Panel
+from rich.table import Table
+from .rich_console import console
+
+# Dependências pesadas usadas só quando um download começa
+HEAVY_MODULES = ("yt_dlp", "eyed3", "requests")
+
+
+class StartupTimer:
+    """Mede as fases da inicialização e o tempo de importação dos módulos pesados.
+
+    As fases são medidas em sequência na thread principal; os módulos
+    carregados em segundo plano por preload() têm o tempo registrado à parte,
+    já que não atrasam a janela. report() mostra tudo em uma tabela.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mede a duração de um bloco da inicialização."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((name, time.perf_counter() - started_at))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def preload(self, modules: Iterable[str] = HEAVY_MODULES) -> threading.Thread:
+        """Importa os módulos em uma thread de fundo, para que o primeiro download não espere por eles."""
+        def run():
+            for name in modules:
+                started_at = time.perf_counter()
+                try:
+                    importlib.import_module(name)
+                except ImportError as e:
+                    console.print(Panel(f"[bold red]Falha ao carregar {name}: {e}[/bold red]"))
+                    continue
+                with self.lock:
+                    self.imports[name] = time.perf_counter() - started_at
+
+        thread = threading.Thread(target=run, name="ytvd-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "total_ms": round(self.elapsed() * 1000, 1),
+                "phases": {name: round(duration * 1000, 1) for name, duration in self.phases},
+                "background_imports": {name: round(duration * 1000, 1) for name, duration in self.imports.items()},
+            }
+
+    def report(self):
+        """Mostra o tempo de cada fase e o total até agora."""
+        data = self.as_dict()
+        table = Table(show_header=True, header_style="bold", box=None)
+        table.add_column("Fase")
+        table.add_column("ms", justify="right")
+        for name, duration in data["phases"].items():
+            table.add_row(name, f"{duration:.1f}")
+        for name, duration in data["background_imports"].items():
+            table.add_row(f"[dim]{name} (segundo plano)[/dim]", f"[dim]{duration:.1f}[/dim]")
+        table.add_row("[bold]Total[/bold]", f"[bold]{data['total_ms']:.1f}[/bold]")
+        console.print(Panel(table, title="Tempo de inicialização"))
+
+
+startup_timer = StartupTimer()
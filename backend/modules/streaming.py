@@ -0,0 +1,72 @@
+import os
+import subprocess
+import time
+from typing import Dict, Any, Callable, Optional
+from .constants import FFMPEG_PATH, AUDIO_BITRATE, DOWNLOAD_SOCKET_TIMEOUT, STREAM_CHUNK_SIZE
+
+STREAMABLE_PROTOCOLS = ("http", "https")
+
+
+def can_stream(format_info: Dict[str, Any]) -> bool:
+    """Indica se o formato escolhido é um arquivo único acessível por HTTP simples."""
+    return bool(format_info.get("url")) and format_info.get("protocol", "https") in STREAMABLE_PROTOCOLS \
+        and not format_info.get("requested_formats")
+
+
+def stream_to_mp3(format_info: Dict[str, Any], output_path: str, progress_hook: Callable[[Dict[str, Any]], None],
+                  throttle: Optional[Callable[[int], None]] = None):
+    """Envia os bytes baixados direto para a entrada do ffmpeg, gravando o MP3 uma única vez.
+
+    A codificação acontece enquanto o download avança, sem arquivo intermediário
+    em disco. Exceções levantadas pelo progress_hook (ex.: cancelamento)
+    interrompem a transferência e o ffmpeg. throttle, se informado, é chamado
+    com o tamanho de cada bloco e pode bloquear para respeitar um limite de banda.
+    """
+    import requests
+    throttle = throttle or (lambda nbytes: None)
+    temp_path = f"{os.path.splitext(output_path)[0]}.temp.mp3"
+    command = [
+        FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+        "-i", "pipe:0", "-vn", "-codec:a", "libmp3lame", "-b:a", f"{AUDIO_BITRATE}k", temp_path,
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    completed = False
+    try:
+        with requests.get(format_info["url"], headers=format_info.get("http_headers") or {},
+                          stream=True, timeout=DOWNLOAD_SOCKET_TIMEOUT) as response:
+            response.raise_for_status()
+            total_bytes = int(response.headers.get("Content-Length") or format_info.get("filesize") or 0)
+            downloaded_bytes = 0
+            started_at = time.monotonic()
+
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                throttle(len(chunk))
+                process.stdin.write(chunk)
+                downloaded_bytes += len(chunk)
+                elapsed = time.monotonic() - started_at
+                progress_hook({
+                    "status": "downloading",
+                    "downloaded_bytes": downloaded_bytes,
+                    "total_bytes": total_bytes,
+                    "speed": downloaded_bytes / elapsed if elapsed > 0 else None,
+                    "filename": output_path,
+                })
+
+        process.stdin.close()
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg falhou ({process.returncode}): {stderr.decode(errors='replace').strip()}")
+
+        os.replace(temp_path, output_path)
+        progress_hook({"status": "finished", "downloaded_bytes": downloaded_bytes,
+                       "total_bytes": downloaded_bytes, "filename": output_path})
+        completed = True
+    finally:
+        if not completed:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
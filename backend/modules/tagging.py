@@ -0,0 +1,241 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from rich.panel import Panel
+from .constants import (
+    CACHE_DIRECTORY, THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_MAX_SIZE, THUMBNAIL_TIMEOUT, THUMBNAIL_WORKERS
+)
+from .http_session import LazySession
+from .library_index import VIDEO_ID_TAG
+from .metrics import metrics
+from .rich_console import console
+from .single_flight import SingleFlight
+
+MIME_BY_SIGNATURE = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG", "image/png"),
+    (b"RIFF", "image/webp"),
+)
+
+
+def image_mime_type(data: bytes) -> str:
+    for signature, mime_type in MIME_BY_SIGNATURE:
+        if data.startswith(signature):
+            return mime_type
+    return "image/jpeg"
+
+
+def downscale_image(data: bytes, max_size: int) -> bytes:
+    """Reduz a capa para no máximo max_size pixels de lado, em JPEG.
+
+    O Pillow é opcional: sem ele, a imagem original é mantida.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= max_size and image_mime_type(data) == "image/jpeg":
+                return data
+            image.thumbnail((max_size, max_size))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=90)
+            return output.getvalue()
+    except Exception:
+        return data
+
+
+class ThumbnailCache:
+    """Capas baixadas por uma sessão HTTP compartilhada e guardadas em disco, pela URL.
+
+    A mesma URL (ex.: ao refazer as tags ou ao baixar vídeo e áudio do
+    mesmo item) não é baixada de novo, e pedidos simultâneos dela
+    compartilham uma única requisição. Com o Pillow instalado, a imagem é
+    reduzida uma vez, antes de ir para o cache.
+    """
+
+    def __init__(self, directory: str = os.path.join(CACHE_DIRECTORY, "thumbnails"),
+                 max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES, max_size: Optional[int] = THUMBNAIL_MAX_SIZE,
+                 workers: int = THUMBNAIL_WORKERS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.workers = workers
+        self.fetches = SingleFlight()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ytvd-thumbnail")
+        self.lock = threading.Lock()
+        self.http = LazySession(pool_connections=4, pool_maxsize=workers)
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    @property
+    def session(self):
+        """Sessão keep-alive compartilhada pelos downloads de capas."""
+        return self.http.get()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def get(self, url: Optional[str], offline: bool = False) -> Optional[bytes]:
+        """Retorna a capa (do disco ou baixada agora), ou None se não houver ou o download falhar.
+
+        Com offline, apenas o cache em disco é consultado.
+        """
+        if not url:
+            return None
+        path = self._path(url)
+        try:
+            with open(path, "rb") as cached_file:
+                data = cached_file.read()
+            os.utime(path)  # Mantém as capas em uso no fim da fila de remoção
+            self._count("hits")
+            return data
+        except OSError:
+            pass
+        if offline:
+            return None
+        return self.fetches.do(url, lambda: self._fetch(url, path))
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def prefetch(self, url: Optional[str]) -> Optional[Future]:
+        """Começa a baixar a capa em segundo plano (ex.: enquanto o áudio é codificado)."""
+        if not url or os.path.exists(self._path(url)):
+            return None
+        return self.executor.submit(self.get, url)
+
+    def _fetch(self, url: str, path: str) -> Optional[bytes]:
+        self._count("misses")
+        try:
+            with metrics.stage("thumbnail"):
+                response = self.session.get(url, timeout=THUMBNAIL_TIMEOUT)
+            if response.status_code != 200 or not response.content:
+                self._count("errors")
+                return None
+            data = downscale_image(response.content, self.max_size) if self.max_size else response.content
+        except Exception as e:
+            self._count("errors")
+            console.print(Panel(f"[bold red]Erro ao baixar a miniatura: {e}[/bold red]"))
+            return None
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, "wb") as cached_file:
+                cached_file.write(data)
+            os.replace(temporary_path, path)
+            self._evict()
+        except OSError as e:
+            console.print(Panel(f"[bold yellow]Não foi possível guardar a miniatura em cache: {e}[/bold yellow]"))
+        return data
+
+    def _evict(self):
+        """Remove as capas mais antigas quando o cache passa do limite de tamanho."""
+        with os.scandir(self.directory) as entries:
+            files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in entries if entry.is_file() and not entry.name.endswith(".tmp")]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+ARTWORK_DESCRIPTION = "Capa do Álbum"
+
+
+def info_from_tag(tag) -> Dict[str, Any]:
+    """Reconstrói os metadados a partir das tags já gravadas no arquivo."""
+    comment = tag.comments.get("") if tag else None
+    video_id = tag.user_text_frames.get(VIDEO_ID_TAG) if tag else None
+    return {
+        "id": video_id.text if video_id else None,
+        "title": tag.title if tag else None,
+        "uploader": tag.artist if tag else None,
+        "upload_date": str(tag.recording_date) if tag and tag.recording_date else None,
+        "description": comment.text if comment else None,
+    }
+
+
+class Mp3Tagger:
+    """Grava todas as tags de um MP3 (texto, ID do vídeo e capa) em um único salvamento."""
+
+    def __init__(self, thumbnails: Optional[ThumbnailCache] = None):
+        self.thumbnails = thumbnails or ThumbnailCache()
+
+    def build_frames(self, video_info: Dict[str, Any], offline: bool = False) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """Separa os valores das tags e a capa (offline: só a capa já em cache)."""
+        frames = {
+            "title": video_info.get("title") or "Título Desconhecido",
+            "artist": video_info.get("uploader") or "Artista Desconhecido",
+            "album": "Download do YouTube",
+            "year": (video_info.get("upload_date") or "")[:4],
+            "comments": video_info.get("description") or "",
+            "video_id": video_info.get("id"),
+        }
+        return frames, self.thumbnails.get(video_info.get("thumbnail"), offline=offline)
+
+    @staticmethod
+    def changed_fields(tag, frames: Dict[str, Any], artwork: Optional[bytes]) -> List[str]:
+        """Campos cujo valor gravado difere do que seria escrito."""
+        comment = tag.comments.get("")
+        video_id = tag.user_text_frames.get(VIDEO_ID_TAG)
+        image = tag.images.get(ARTWORK_DESCRIPTION)
+        current = {
+            "title": tag.title,
+            "artist": tag.artist,
+            "album": tag.album,
+            "year": str(tag.recording_date) if tag.recording_date else "",
+            "comments": comment.text if comment else "",
+            "video_id": video_id.text if video_id else None,
+        }
+        # Campos vazios (ano, ID) não apagam o que já está gravado
+        changed = [name for name, value in frames.items()
+                   if (value or name not in ("year", "video_id")) and current[name] != value]
+        if artwork and (image is None or image.image_data != artwork):
+            changed.append("artwork")
+        return changed
+
+    def tag(self, file_path: str, video_info: Optional[Dict[str, Any]], offline: bool = False,
+            dry_run: bool = False) -> List[str]:
+        """Adiciona os metadados ao MP3, reescrevendo o arquivo uma única vez.
+
+        Sem video_info, as tags atuais do arquivo são reaplicadas (útil ao mudar
+        as convenções, como o nome do álbum). Retorna os campos alterados; se
+        nada mudou, ou com dry_run, o arquivo não é regravado.
+        """
+        import eyed3
+        audiofile = eyed3.load(file_path)
+        if audiofile is None:
+            raise ValueError(f"Arquivo de áudio inválido: {file_path}")
+        if audiofile.tag is None:
+            audiofile.initTag()
+
+        tag = audiofile.tag
+        frames, artwork = self.build_frames(video_info or info_from_tag(tag), offline)
+        changed = self.changed_fields(tag, frames, artwork)
+        if dry_run or not changed:
+            return changed
+
+        tag.title = frames["title"]
+        tag.artist = frames["artist"]
+        tag.album = frames["album"]
+        if frames["year"]:
+            tag.recording_date = frames["year"]
+        tag.comments.set(frames["comments"])
+        if frames["video_id"]:
+            # Permite identificar o vídeo de origem ao reindexar a biblioteca
+            tag.user_text_frames.set(frames["video_id"], VIDEO_ID_TAG)
+        if artwork:
+            tag.images.set(3, artwork, image_mime_type(artwork), ARTWORK_DESCRIPTION)
+        tag.save()
+        return changed
@@ -0,0 +1,73 @@
+import re
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+# IDs de vídeo do YouTube têm sempre 11 caracteres
+VIDEO_ID_REGEX = re.compile(r'[\w-]{11}')
+# Caminhos de canais: /@nome, /channel/ID, /c/nome, /user/nome
+CHANNEL_PATH_REGEX = re.compile(r'/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)(/(videos|shorts|streams|playlists))?/?')
+
+
+def is_domain(host: str, domain: str) -> bool:
+    """Indica se o host é o domínio ou um subdomínio dele (evita aceitar, ex., notyoutube.com)."""
+    return host == domain or host.endswith("." + domain)
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Extrai o ID canônico do vídeo de uma URL do YouTube (ou None se não houver)."""
+    if not url:
+        return None
+    if VIDEO_ID_REGEX.fullmatch(url):
+        return url
+
+    parsed_url = urlparse(url if "://" in url else f"https://{url}")
+    host = (parsed_url.hostname or "").lower()
+
+    if is_domain(host, "youtu.be"):
+        video_id = parsed_url.path.lstrip("/").split("/")[0]
+    elif is_domain(host, "youtube.com"):
+        if parsed_url.path == "/watch":
+            video_id = parse_qs(parsed_url.query).get("v", [""])[0]
+        elif parsed_url.path.startswith(("/shorts/", "/embed/", "/live/")):
+            video_id = parsed_url.path.split("/")[2]
+        else:
+            return None
+    else:
+        return None
+
+    return video_id if VIDEO_ID_REGEX.fullmatch(video_id) else None
+
+
+def canonical_url(video_id: str) -> str:
+    """Monta a URL canônica de um vídeo a partir do seu ID."""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def is_collection_url(url: str) -> bool:
+    """Indica se a URL é de uma playlist ou de um canal (e não de um vídeo único)."""
+    if not url or extract_video_id(url):
+        return False
+    parsed_url = urlparse(url if "://" in url else f"https://{url}")
+    if not is_domain((parsed_url.hostname or "").lower(), "youtube.com"):
+        return False
+    if parsed_url.path == "/playlist":
+        return bool(parse_qs(parsed_url.query).get("list"))
+    return bool(CHANNEL_PATH_REGEX.fullmatch(parsed_url.path))
+
+
+def channel_videos_url(url: str) -> str:
+    """Aponta a URL de um canal para a aba de vídeos (mais recentes primeiro)."""
+    parsed_url = urlparse(url if "://" in url else f"https://{url}")
+    match = CHANNEL_PATH_REGEX.fullmatch(parsed_url.path)
+    if match and not match.group(2):
+        return f"https://www.youtube.com/{match.group(1)}/videos"
+    return url
+
+
+def is_chronological_channel_url(url: str) -> bool:
+    """Indica se a URL lista os vídeos de um canal do mais recente para o mais antigo."""
+    parsed_url = urlparse(url if "://" in url else f"https://{url}")
+    if not is_domain((parsed_url.hostname or "").lower(), "youtube.com"):
+        return False
+    match = CHANNEL_PATH_REGEX.fullmatch(parsed_url.path)
+    return bool(match) and match.group(3) != "playlists"
@@ -0,0 +1,22 @@
+from modules.startup import startup_timer
+
+with startup_timer.phase("Importação dos módulos"):
+    from modules.constants import STARTUP_REPORT
+    from modules.download_manager import DownloadManager
+    from modules.api_server import ApiServer
+
+
+def main():
+    # Executa apenas o servidor da API, sem a interface gráfica
+    with startup_timer.phase("Gerenciador de downloads"):
+        download_manager = DownloadManager()
+    startup_timer.preload()
+    with startup_timer.phase("Aquecimento da extração"):
+        download_manager.extraction_pool.warm_up()
+    if STARTUP_REPORT:
+        startup_timer.report()
+    ApiServer(download_manager).run()
+
+
+if __name__ == '__main__':
+    main()